@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Email Extraction Benchmark
+Measures extract_emails throughput over real-world-sized HTML pages
+
+Usage:
+    python bench_extract.py                      # Synthetic corpus (200 pages)
+    python bench_extract.py --pages 500 --size 300
+    python bench_extract.py --corpus saved_pages/  # Directory of saved .html files
+
+Reports pages/s and MB/s for bytes input, str input and the previous
+regex-plus-filter implementation, so changes to the extractor can be compared.
+"""
+
+import re
+import sys
+import time
+import random
+from pathlib import Path
+from email_scraper import extract_emails
+
+
+def legacy_extract(text):
+    """The extractor as it was before the single-pass engine (for comparison)."""
+    emails = re.findall(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text)
+    filtered = []
+    for email in emails:
+        email = email.lower()
+        if any(ext in email for ext in ['.png', '.jpg', '.gif', '.css', '.js']):
+            continue
+        if 'example.com' in email or 'example.org' in email:
+            continue
+        filtered.append(email)
+    found = set(filtered)
+    found.update(e.lower() for e in re.findall(r'mailto:([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', text))
+    return found
+
+
+def _cfemail(email, key):
+    return f'{key:02x}' + ''.join(f'{ord(c) ^ key:02x}' for c in email)
+
+
+def synthetic_page(rng, size_kb):
+    """A care-home style page: nav, inline CSS/JS, body copy, footer contacts."""
+    domain = f"{rng.choice(['sunny', 'oak', 'willow', 'meadow', 'rose'])}{rng.randint(1, 999)}.co.uk"
+    words = ('care home residents nursing dementia activities family visiting garden lounge '
+             'qualified staff respite rating inspection welcome enquiries ').split()
+
+    parts = ['<!DOCTYPE html><html><head><title>Care Home</title>',
+             '<style>' + ' '.join(f'.c{i}{{margin:{i}px;background:url(img/bg@2x.png)}}' for i in range(40)) + '</style>',
+             '<script>' + 'var x=' + ','.join(str(rng.random()) for _ in range(200)) + ';</script></head><body>',
+             '<nav>' + ''.join(f'<a href="/page-{i}">Page {i}</a>' for i in range(30)) + '</nav>']
+
+    target = size_kb * 1024
+    length = sum(map(len, parts))
+    while length < target:
+        para = '<p class="c%d">%s</p>\n' % (rng.randint(0, 39), ' '.join(rng.choice(words) for _ in range(60)))
+        parts.append(para)
+        length += len(para)
+
+    parts.append(
+        f'<footer><a href="mailto:info@{domain}">Email us</a> manager [at] {domain.replace(".", " [dot] ")} '
+        f'<span class="__cf_email__" data-cfemail="{_cfemail("admin@" + domain, rng.randint(1, 255))}">[email protected]</span> '
+        f'office&#64;{domain} <img src="logo@2x.png"></footer></body></html>')
+    return ''.join(parts).encode()
+
+
+def load_corpus(directory):
+    return [p.read_bytes() for p in sorted(Path(directory).glob('**/*.htm*'))]
+
+
+def bench(name, func, pages, repeat=3):
+    total_bytes = sum(len(p) for p in pages)
+    best = float('inf')
+    found = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = sum(len(func(page)) for page in pages)
+        best = min(best, time.perf_counter() - start)
+
+    print(f"  {name:<22} {len(pages) / best:8.1f} pages/s {total_bytes / best / 1e6:8.1f} MB/s "
+          f"({found} emails)")
+    return best
+
+
+def main():
+    pages_count = 200
+    size_kb = 150
+
+    if '--pages' in sys.argv:
+        pages_count = int(sys.argv[sys.argv.index('--pages') + 1])
+    if '--size' in sys.argv:
+        size_kb = int(sys.argv[sys.argv.index('--size') + 1])
+
+    if '--corpus' in sys.argv:
+        pages = load_corpus(sys.argv[sys.argv.index('--corpus') + 1])
+        if not pages:
+            print("No .html files found in corpus directory")
+            sys.exit(1)
+    else:
+        rng = random.Random(42)
+        pages = [synthetic_page(rng, rng.randint(size_kb // 2, size_kb * 3 // 2)) for _ in range(pages_count)]
+
+    total_mb = sum(len(p) for p in pages) / 1e6
+    print(f"Corpus: {len(pages)} pages, {total_mb:.1f} MB\n")
+
+    texts = [p.decode('utf-8', 'replace') for p in pages]
+    bench('extract_emails(bytes)', extract_emails, pages)
+    bench('extract_emails(str)', extract_emails, texts)
+    bench('legacy (str)', legacy_extract, texts)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,588 @@
+#!/usr/bin/env python3
+"""
+End-to-end Benchmark for Go Owl Digital
+Runs the scripts against a local stand-in for the CQC API, Companies House
+and thousands of care-home websites, and reports throughput
+
+Usage:
+    python bench_pipeline.py                                 # Every stage, default sizes
+    python bench_pipeline.py scrape-list --sites 5000 --concurrency 100
+    python bench_pipeline.py build-list --homes 5000 --max 1000
+    python bench_pipeline.py --latency 0.2 --not-found 0.3 --dead 0.1 --page-kb 300
+    python bench_pipeline.py --repeat 3 --save before.json  # Keep the best of 3 runs...
+    python bench_pipeline.py --repeat 3 --compare before.json  # ...and compare after a change
+
+Stages: download, enrich, build-list, scrape-list, search-sic (build-list
+needs enrich, which needs download, so those run first). Each stage runs
+as a subprocess in a scratch directory with the API URLs and caches
+pointed at the fake services, so caches start cold and no real service
+or local data is touched.
+
+Request counts come from each stage's run report (see run_stats.py). CPU
+covers the stage's whole process tree, including the extraction
+processes scrape-list starts. Peak MB is the largest single process;
+Tree MB is the most the whole tree held at once, sampled from /proc
+every 0.1s (Linux only), so short spikes can be missed.
+"""
+
+import os
+import sys
+import csv
+import glob
+import json
+import math
+import time
+import zlib
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+DEFAULTS = {
+    '--homes': 2000,       # CQC care home locations
+    '--sites': 2000,       # Care home websites (homes share them when there are fewer)
+    '--companies': 500,    # Companies House search results
+    '--latency': 0.02,     # Seconds added to every response
+    '--not-found': 0.1,    # Share of site pages answered with a 404
+    '--dead': 0.05,        # Share of sites refusing connections
+    '--page-kb': 60,       # Size of each site page
+    '--max': 500,          # build-list --max
+    '--concurrency': 50,   # scrape-list --concurrency
+    '--repeat': 1,         # Runs per stage - the fastest is reported
+}
+
+SIC_CODE = '87300'
+COMPANY_BASE = 10000000
+RATINGS = ['Good', 'Outstanding', 'Requires improvement', 'Good']
+CONTACT_PATHS = ['/contact-us', '/contact', '/get-in-touch', '/find-us']
+OTHER_PATHS = ['/about', '/our-home', '/care', '/news']
+
+# Each stage: the script command line, its output CSV and any stage it needs first
+STAGES = {
+    'download': {
+        'command': lambda o: ['cqc_email_builder.py', 'download'],
+        'output': 'cqc_care_homes.csv',
+    },
+    'enrich': {
+        'command': lambda o: ['cqc_email_builder.py', 'enrich', 'cqc_care_homes.csv', 'cqc_enriched.csv'],
+        'output': 'cqc_enriched.csv',
+        'needs': 'download',
+    },
+    'build-list': {
+        'command': lambda o: ['cqc_email_builder.py', 'build-list', 'cqc_enriched.csv', '--max', str(o['--max'])],
+        'output': 'careowl_targets.csv',
+        'needs': 'enrich',
+    },
+    'scrape-list': {
+        'command': lambda o: ['email_scraper.py', 'scrape-list', 'websites.txt',
+                              '--concurrency', str(o['--concurrency'])],
+        'output': 'scraped_emails.csv',
+    },
+    'search-sic': {
+        'command': lambda o: ['companies_house.py', 'search-sic', SIC_CODE, '--limit', str(o['--companies'])],
+        'output': f'sic_{SIC_CODE}_targets.csv',
+    },
+}
+
+# Everything a stage might read or write outside its working directory
+SCRATCH_FILES = {
+    'CQC_CACHE': 'cqc_cache.db',
+    'COMPANIES_HOUSE_CACHE': 'ch_cache.db',
+    'COMPANIES_HOUSE_BULK_DB': 'ch_bulk.db',
+    'SCRAPE_CACHE': 'scrape_cache.db',
+    'OUTREACH_STORE': 'outreach.db',
+    'RUN_REPORT_DIR': 'run_reports',
+}
+
+
+def _chance(key, rate):
+    """Deterministic coin flip, so every run sees the same dead sites and 404s."""
+    return zlib.crc32(key.encode()) % 10000 < rate * 10000
+
+
+def site_host(i):
+    """Site i lives on its own loopback address: 127.1.0.0, 127.1.0.1, ..."""
+    return f'127.{1 + i // 65536}.{i // 256 % 256}.{i % 256}'
+
+
+def site_index(host):
+    parts = host.split('.')
+    if len(parts) != 4 or parts[0] != '127' or not all(p.isdigit() for p in parts):
+        return None
+    return (int(parts[1]) - 1) * 65536 + int(parts[2]) * 256 + int(parts[3])
+
+
+def filler_html(size_kb, seed=42):
+    """Body copy and inline CSS/JS padding out a page to roughly size_kb."""
+    rng = random.Random(seed)
+    words = ('care home residents nursing dementia activities family visiting garden lounge '
+             'qualified staff respite rating inspection welcome enquiries meals').split()
+    parts = ['<style>' + ' '.join(f'.c{i}{{margin:{i}px;background:url(img/bg@2x.png)}}' for i in range(40))
+             + '</style><script>var x=' + ','.join(str(rng.random()) for _ in range(100)) + ';</script>']
+    length = len(parts[0])
+    while length < size_kb * 1024:
+        para = '<p class="c%d">%s</p>\n' % (rng.randint(0, 39), ' '.join(rng.choice(words) for _ in range(60)))
+        parts.append(para)
+        length += len(para)
+    return ''.join(parts).encode()
+
+
+class FakeServices(ThreadingHTTPServer):
+    """
+    One server for everything: the CQC API under /cqc and Companies House
+    under /ch on 127.0.0.1, and care home site i on 127.x.y.z (site_host).
+    It listens on every address so the whole 127/8 range reaches it, but
+    only answers loopback clients.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, options):
+        super().__init__(('', 0), BenchHandler)
+        self.options = options
+        self.port = self.server_address[1]
+        self.filler = filler_html(options['--page-kb'])
+
+        # Bound but never listening: connections to this port are refused
+        self.dead_socket = socket.socket()
+        self.dead_socket.bind(('', 0))
+        self.dead_port = self.dead_socket.getsockname()[1]
+
+    def verify_request(self, request, client_address):
+        return client_address[0].startswith('127.')
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        self.dead_socket.close()
+
+    def api_url(self, prefix):
+        return f'http://127.0.0.1:{self.port}/{prefix}'
+
+    def site_url(self, i):
+        port = self.dead_port if _chance(f'dead{i}', self.options['--dead']) else self.port
+        return f'http://{site_host(i)}:{port}/'
+
+    # CQC API
+
+    def cqc_location(self, i):
+        """Location details, as enrich fetches them."""
+        return {
+            'locationId': f'1-{i}',
+            'name': f'Bench Care Home {i}',
+            'postalCode': f'LS{i % 28 + 1} {i % 9 + 1}AB',
+            # One in twenty homes has no website of its own
+            'website': self.site_url(i % self.options['--sites']) if i % 20 != 19 else '',
+            'mainPhoneNumber': f'0113 {i % 1000000:06d}',
+            'postalAddressLine1': f'{i % 200 + 1} Bench Road',
+            'postalAddressTownCity': 'Leeds',
+            'providerId': f'1-{100000 + i // 3}',
+            'registrationStatus': 'Registered',
+            'careHome': 'Y',
+            'currentRatings': {'overall': {'rating': RATINGS[i % len(RATINGS)]}},
+        }
+
+    def cqc(self, path, query):
+        homes = self.options['--homes']
+        if path == '/locations':
+            page = int(query.get('page', ['1'])[0])
+            per_page = int(query.get('perPage', ['500'])[0])
+            first = (page - 1) * per_page
+            return {
+                'total': homes,
+                'totalPages': math.ceil(homes / per_page),
+                'page': page,
+                'perPage': per_page,
+                'locations': [{'locationId': f'1-{i}', 'locationName': f'Bench Care Home {i}',
+                               'postalCode': f'LS{i % 28 + 1} {i % 9 + 1}AB'}
+                              for i in range(first, min(homes, first + per_page))],
+            }
+        if path.startswith('/locations/1-'):
+            i = path.rsplit('-', 1)[1]
+            if i.isdigit() and int(i) < homes:
+                return self.cqc_location(int(i))
+        if path == '/changes/location':
+            return {'changes': [], 'total': 0, 'page': 1, 'totalPages': 1}
+        return None
+
+    # Companies House API
+
+    def company(self, i):
+        return {
+            'company_number': str(COMPANY_BASE + i),
+            'company_name': f'BENCH CARE {i} LIMITED',
+            'company_status': 'active',
+            'sic_codes': [SIC_CODE],
+            'registered_office_address': {'address_line_1': f'{i % 200 + 1} Bench Road',
+                                          'locality': 'Leeds', 'postal_code': f'LS{i % 28 + 1} {i % 9 + 1}AB'},
+        }
+
+    def companies_house(self, path, query):
+        companies = self.options['--companies']
+        if path in ('/advanced-search/companies', '/search/companies'):
+            start = int(query.get('start_index', ['0'])[0])
+            size = int(query.get('size', query.get('items_per_page', ['20']))[0])
+            items = []
+            for i in range(start, min(companies, start + size)):
+                item = self.company(i)
+                item['title'] = item['company_name']
+                items.append(item)
+            return {'items': items, 'hits': companies, 'total_results': companies,
+                    'start_index': start, 'items_per_page': size}
+
+        parts = path.strip('/').split('/')
+        if len(parts) in (2, 3) and parts[0] == 'company' and parts[1].isdigit():
+            i = int(parts[1]) - COMPANY_BASE
+            if not 0 <= i < companies:
+                return None
+            if len(parts) == 2:
+                return self.company(i)
+            if parts[2] == 'officers':
+                return {'items': [
+                    {'name': f'SMITH, Jane {i}', 'officer_role': 'director'},
+                    {'name': f'PATEL, Ravi {i}', 'officer_role': 'director'},
+                    {'name': f'JONES, Alan {i}', 'officer_role': 'secretary'},
+                ]}
+        return None
+
+    # Care home websites
+
+    def site_page(self, i, path):
+        """(status, content type, body) for a page of site i."""
+        if path == '/robots.txt':
+            return 200, 'text/plain', b'User-agent: *\nDisallow: /admin/\n'
+        contact = CONTACT_PATHS[i % len(CONTACT_PATHS)]
+        if path not in ['/', contact] + OTHER_PATHS or _chance(f'{i}{path}', self.options['--not-found']):
+            return 404, 'text/html', b'<html><body>Not found</body></html>'
+
+        domain = f'benchcare{i}.co.uk'
+        emails = ''
+        # Two sites in three show an address on every page; the rest only on the contact page
+        if i % 3:
+            emails = f'<footer>Email <a href="mailto:enquiries@{domain}">enquiries@{domain}</a></footer>'
+        if path == contact:
+            emails += (f'<p>Manager: manager@{domain} - general: '
+                       f'<a href="mailto:info@{domain}">info@{domain}</a></p>')
+        nav = ''.join(f'<a href="{p}">{p.strip("/").replace("-", " ").title()}</a>'
+                      for p in OTHER_PATHS + [contact])
+        body = b''.join([f'<!DOCTYPE html><html><head><title>Bench Care Home {i}</title>'.encode(),
+                         self.filler[:len(self.filler) // 2],
+                         f'</head><body><nav>{nav}</nav>'.encode(),
+                         self.filler[len(self.filler) // 2:],
+                         f'{emails}</body></html>'.encode()])
+        return 200, 'text/html; charset=utf-8', body
+
+
+class BenchHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.options['--latency'])
+        url = urlparse(self.path)
+        host = (self.headers.get('Host') or '').split(':')[0]
+
+        if host == '127.0.0.1':
+            query = parse_qs(url.query)
+            body = None
+            if url.path.startswith('/cqc/'):
+                body = server.cqc(url.path[len('/cqc'):], query)
+            elif url.path.startswith('/ch/'):
+                body = server.companies_house(url.path[len('/ch'):], query)
+            if body is None:
+                self.respond(404, 'application/json', b'{"errors": [{"error": "not-found"}]}')
+            else:
+                self.respond(200, 'application/json', json.dumps(body).encode())
+            return
+
+        i = site_index(host)
+        if i is None or i >= server.options['--sites']:
+            self.respond(404, 'text/html', b'')
+            return
+        self.respond(*server.site_page(i, url.path))
+
+    def respond(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def stage_env(scratch, server):
+    """The environment a stage runs in: fake API URLs, every cache in the scratch directory."""
+    env = dict(os.environ)
+    env.update({
+        'CQC_API_URL': server.api_url('cqc'),
+        'COMPANIES_HOUSE_API_URL': server.api_url('ch'),
+        'COMPANIES_HOUSE_API_KEY': 'bench',
+        # Quotas are policy waits, not something to benchmark
+        'COMPANIES_HOUSE_RATE_LIMIT': str(10 ** 9),
+        'CQC_REQUESTS_PER_SECOND': str(10 ** 6),
+        'NO_PROXY': '*',
+    })
+    for var, name in SCRATCH_FILES.items():
+        env[var] = os.path.join(scratch, name)
+    return env
+
+
+def count_rows(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, newline='', encoding='utf-8') as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def read_report(scratch, argv):
+    """The run report the stage's script wrote (see run_stats.py)."""
+    script = argv[0][:-len('.py')]
+    paths = glob.glob(os.path.join(scratch, SCRATCH_FILES['RUN_REPORT_DIR'], f'{script}-{argv[1]}-*.json'))
+    if not paths:
+        return {}
+    with open(max(paths, key=os.path.getmtime)) as f:
+        return json.load(f)
+
+
+def _tree_rss(root):
+    """Resident bytes of a process and all its descendants, read from /proc."""
+    children = {}
+    rss = {}
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue  # Exited while we looked
+        children.setdefault(int(fields[1]), []).append(int(entry))
+        rss[int(entry)] = int(fields[21]) * page_size
+
+    total = 0
+    todo = [root]
+    while todo:
+        pid = todo.pop()
+        total += rss.get(pid, 0)
+        todo.extend(children.get(pid, []))
+    return total
+
+
+class TreeMemorySampler:
+    """Tracks the peak combined RSS of a process tree while it runs."""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = None
+        if os.path.isdir('/proc'):
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, _tree_rss(self.pid))
+
+    def stop(self):
+        """Stop sampling. Returns the peak in MB, or None without /proc."""
+        self.stopped.set()
+        if self.thread is None:
+            return None
+        self.thread.join()
+        return round(self.peak / 1024 / 1024, 1)
+
+
+def run_stage(name, scratch, env, options):
+    """Run one stage as a subprocess. Returns its result, or None if it failed."""
+    argv = STAGES[name]['command'](options)
+    log_path = os.path.join(scratch, f'{name}.log')
+
+    with open(log_path, 'w') as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, str(SCRIPTS_DIR / argv[0])] + argv[1:],
+                                cwd=scratch, env=env, stdout=log, stderr=subprocess.STDOUT)
+        sampler = TreeMemorySampler(proc.pid)
+        # wait4's CPU covers the stage and every process it waited for;
+        # its ru_maxrss is the largest of them, not their sum
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - start
+        tree_mb = sampler.stop()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    if proc.returncode != 0:
+        print(f"  {name} failed (exit code {proc.returncode}) - last lines of {log_path}:")
+        with open(log_path) as f:
+            for line in f.readlines()[-10:]:
+                print(f"    {line.rstrip()}")
+        return None
+
+    report = read_report(scratch, argv)
+    timers = report.get('timers', {})
+    rows = count_rows(os.path.join(scratch, STAGES[name]['output']))
+    requests = report.get('http', {}).get('requests', 0)
+    return {
+        'rows': rows,
+        'seconds': round(seconds, 2),
+        'rows_per_second': round(rows / seconds, 1),
+        'requests': requests,
+        'requests_per_row': float(f'{requests / rows:.3g}') if rows else None,
+        'errors': report.get('http', {}).get('errors', 0),
+        # Politeness delays, summed across threads
+        'waiting_seconds': round(sum(timers.get(t, {}).get('seconds', 0) for t in ('sleep', 'rate_limit')), 1),
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 2),
+        'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),  # KB on Linux
+        'tree_rss_mb': tree_mb,
+    }
+
+
+def plan(targets):
+    """The targets plus the stages they need, in STAGES order."""
+    needed = set()
+    for name in targets:
+        while name and name not in needed:
+            needed.add(name)
+            name = STAGES[name].get('needs')
+    return [name for name in STAGES if name in needed]
+
+
+def run_bench(stages, options, keep=False):
+    """Run the stages options['--repeat'] times. Returns the fastest result per stage."""
+    server = FakeServices(options).start()
+    print(f"Fake services on port {server.port}: {options['--homes']} homes, {options['--sites']} sites "
+          f"({options['--dead']:.0%} dead, {options['--not-found']:.0%} of pages 404, "
+          f"{options['--page-kb']} KB pages), {options['--companies']} companies, "
+          f"{options['--latency'] * 1000:.0f} ms latency\n")
+
+    best = {}
+    try:
+        for run in range(1, options['--repeat'] + 1):
+            # Fresh directory per run, so every run starts with cold caches
+            scratch = tempfile.mkdtemp(prefix='bench_pipeline_')
+            env = stage_env(scratch, server)
+            with open(os.path.join(scratch, 'websites.txt'), 'w') as f:
+                f.writelines(server.site_url(i) + '\n' for i in range(options['--sites']))
+
+            for name in stages:
+                print(f"[run {run}] {name}...")
+                result = run_stage(name, scratch, env, options)
+                if result is None:
+                    print(f"  Scratch directory kept: {scratch}")
+                    return None
+                print(f"  {result['rows']} rows in {result['seconds']:.1f}s")
+                if name not in best or result['seconds'] < best[name]['seconds']:
+                    best[name] = result
+
+            if keep:
+                print(f"  Scratch directory kept: {scratch}")
+            else:
+                shutil.rmtree(scratch, ignore_errors=True)
+    finally:
+        server.close()
+    return best
+
+
+def print_results(results, baseline=None):
+    print(f"\n{'Stage':<12} {'Rows':>7} {'Seconds':>8} {'Rows/s':>8} {'Requests':>9} {'Req/row':>8} "
+          f"{'Waiting':>8} {'CPU s':>7} {'Peak MB':>8} {'Tree MB':>8}")
+    for name, r in results.items():
+        per_row = f"{r['requests_per_row']:.3g}" if r['requests_per_row'] is not None else '-'
+        print(f"{name:<12} {r['rows']:>7} {r['seconds']:>8.1f} {r['rows_per_second']:>8.1f} {r['requests']:>9} "
+              f"{per_row:>8} {r['waiting_seconds']:>8.1f} {r['cpu_seconds']:>7.1f} {r['peak_rss_mb']:>8.1f} "
+              f"{r['tree_rss_mb'] if r['tree_rss_mb'] is not None else '-':>8}")
+    print("(Waiting is time in politeness delays, summed across threads. Peak MB is the largest\n"
+          " single process; Tree MB the whole process tree, sampled.)")
+
+    if not baseline:
+        return
+    print(f"\nCompared with {baseline['path']}:")
+    for name, r in results.items():
+        base = baseline['results'].get(name)
+        if not base:
+            continue
+        changes = [_change('rows/s', base['rows_per_second'], r['rows_per_second']),
+                   _change('req/row', base['requests_per_row'], r['requests_per_row']),
+                   _change('CPU', base['cpu_seconds'], r['cpu_seconds']),
+                   _change('peak RSS', base['peak_rss_mb'], r['peak_rss_mb']),
+                   _change('tree RSS', base.get('tree_rss_mb'), r['tree_rss_mb'])]
+        print(f"  {name:<12} {', '.join(c for c in changes if c)}")
+
+
+def _change(label, before, after):
+    if not before or after is None:
+        return ''
+    return f"{label} {(after - before) / before:+.0%}"
+
+
+def load_baseline(path, options):
+    with open(path) as f:
+        baseline = json.load(f)
+    baseline['path'] = path
+    different = {k: (baseline['options'].get(k), v) for k, v in options.items()
+                 if k != '--repeat' and baseline['options'].get(k) != v}
+    if different:
+        print(f"Warning: {path} was run with different options: "
+              + ', '.join(f"{k} {old} (now {new})" for k, (old, new) in different.items()))
+    return baseline
+
+
+def main():
+    args = sys.argv[1:]
+    if '--help' in args or '-h' in args:
+        print(__doc__)
+        sys.exit(0)
+
+    options = dict(DEFAULTS)
+    targets = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in DEFAULTS:
+            options[arg] = type(DEFAULTS[arg])(args[i + 1])
+            i += 2
+        elif arg in ('--save', '--compare'):
+            i += 2
+        elif arg == '--keep':
+            i += 1
+        elif arg in STAGES:
+            targets.append(arg)
+            i += 1
+        else:
+            print(f"Unknown argument: {arg}")
+            print(__doc__)
+            sys.exit(1)
+
+    baseline = None
+    if '--compare' in args:
+        baseline = load_baseline(args[args.index('--compare') + 1], options)
+
+    results = run_bench(plan(targets or list(STAGES)), options, keep='--keep' in args)
+    if results is None:
+        sys.exit(1)
+    print_results(results, baseline)
+
+    if '--save' in args:
+        path = args[args.index('--save') + 1]
+        with open(path, 'w') as f:
+            json.dump({'options': options, 'results': results}, f, indent=2)
+        print(f"\nSaved results to {path}")
+
+
+if __name__ == '__main__':
+    main()
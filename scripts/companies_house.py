@@ -4,20 +4,38 @@ Companies House API - Free business data lookup
 Requires free API key from: https://developer.company-information.service.gov.uk/
 
 Usage:
-    python companies_house.py search "Luxury Wood Company"
+    python companies_house.py search "Luxury Wood Company" --limit 250
     python companies_house.py search-sic 49410 --limit 100  # Road freight
     python companies_house.py search-sic 87100 --limit 100  # Care homes
+    python companies_house.py search-sic-batch 49410 52290 87100 87300 --limit 100
+    python companies_house.py search-sic-batch all --limit 100
+    python companies_house.py ingest-bulk BasicCompanyDataAsOneFile-2024-10-01.zip
     python companies_house.py get-company 12345678
     python companies_house.py get-officers 12345678
+    python companies_house.py get-company 12345678 --refresh  # Bypass cache
+    python companies_house.py sync [ch_targets.csv ...] [--max-events N]
 """
 
+import io
 import os
+import glob
+import re
 import sys
 import csv
 import json
+import time
 import base64
+import sqlite3
+import zipfile
+import threading
 import requests
-from time import sleep
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError, ReadTimeoutError
+from disk_cache import DiskCache
+from target_store import TargetStore
+from run_stats import stats, run_main
 
 # Get API key from environment
 API_KEY = os.environ.get('COMPANIES_HOUSE_API_KEY', '')
@@ -33,7 +51,37 @@ SIC_CODES = {
     '47990': 'Other retail sale via mail order/internet',
 }
 
-BASE_URL = 'https://api.company-information.service.gov.uk'
+# Override to point at a local stub server when testing
+BASE_URL = os.environ.get('COMPANIES_HOUSE_API_URL', 'https://api.company-information.service.gov.uk')
+
+# Companies House quota: 600 requests per 5 minutes per API key
+# (set COMPANIES_HOUSE_RATE_LIMIT if your key has been granted a higher one)
+RATE_LIMIT_REQUESTS = int(os.environ.get('COMPANIES_HOUSE_RATE_LIMIT', 600))
+RATE_LIMIT_PERIOD = 300
+RATE_LIMIT_BURST = 10
+MAX_WORKERS = 8
+SEARCH_PAGE_SIZE = 100  # API maximum items_per_page
+ADVANCED_SEARCH_PAGE_SIZE = 5000  # API maximum size for advanced search
+
+# On-disk cache of company and officer lookups, shared between runs
+CACHE_FILE = os.environ.get('COMPANIES_HOUSE_CACHE', 'ch_cache.db')
+CACHE_MAX_ENTRIES = 50000
+CACHE_TTLS = {
+    'company': 7 * 86400,    # Status and address change rarely
+    'officers': 14 * 86400,  # Director appointments change even less
+}
+REFRESH = False  # Set by --refresh to ignore cached entries
+
+# Local SIC index built from the bulk "Basic Company Data" snapshot
+# Download from: https://download.companieshouse.gov.uk/en_output.html
+BULK_DB = os.environ.get('COMPANIES_HOUSE_BULK_DB', 'ch_bulk.db')
+BULK_BATCH_SIZE = 10000
+
+# Streaming API for incremental sync (separate stream key required)
+STREAM_URL = os.environ.get('COMPANIES_HOUSE_STREAM_URL', 'https://stream.companieshouse.gov.uk')
+STREAM_KEY = os.environ.get('COMPANIES_HOUSE_STREAM_KEY', '')
+STREAM_IDLE_TIMEOUT = 60  # Seconds without events before we treat the stream as caught up
+SYNC_CHECKPOINT = 'ch_sync_checkpoint.json'
 
 
 def get_auth_header():
@@ -48,16 +96,111 @@ def get_auth_header():
     return {'Authorization': f'Basic {encoded}'}
 
 
+class RateLimiter:
+    """
+    Token bucket shared by all worker threads.
+    Refill rate leaves room for the burst so no 5 minute window
+    ever exceeds the Companies House quota.
+    """
+
+    def __init__(self, requests_per_period=RATE_LIMIT_REQUESTS,
+                 period=RATE_LIMIT_PERIOD, burst=RATE_LIMIT_BURST):
+        self.rate = (requests_per_period - burst) / period
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            stats.sleep(wait, 'rate_limit')
+
+
+rate_limiter = RateLimiter()
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+
+
+def get_session():
+    """Shared pooled session with the auth header set once."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(get_auth_header())
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS * 2)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def api_get(path, params=None, retries=3):
+    """
+    Rate-limited GET against the Companies House API.
+    Backs off and retries when the quota is exhausted (HTTP 429).
+    """
+    for attempt in range(retries + 1):
+        rate_limiter.acquire()
+        response = stats.get(get_session().get, f'{BASE_URL}{path}', params=params, timeout=10)
+        if response.status_code != 429 or attempt == retries:
+            return response
+
+        # Quota exceeded elsewhere (another process on the same key) - wait for reset
+        reset = response.headers.get('X-Ratelimit-Reset')
+        wait = max(1, int(reset) - int(time.time())) if reset and reset.isdigit() else 30
+        print(f"  Rate limited, waiting {min(wait, RATE_LIMIT_PERIOD)}s...")
+        stats.sleep(min(wait, RATE_LIMIT_PERIOD), 'rate_limit')
+
+
+def get_cache():
+    """Open the response cache on first use."""
+    global _cache
+    with _session_lock:
+        if _cache is None:
+            _cache = DiskCache(CACHE_FILE, max_entries=CACHE_MAX_ENTRIES)
+        return _cache
+
+
+def cached_get(resource, company_number, path):
+    """
+    Fetch a per-company resource, answering from the disk cache when fresh.
+    Only successful responses are cached.
+    """
+    if not REFRESH:
+        cached = get_cache().get(resource, company_number, ttl=CACHE_TTLS[resource])
+        if cached is not None:
+            stats.count('cache_hits')
+            return cached
+
+    try:
+        response = api_get(path)
+        if response.status_code == 200:
+            return get_cache().set(resource, company_number, response.json())
+        else:
+            return None
+    except:
+        return None
+
+
 def search_companies(query, items_per_page=50):
     """Search for companies by name."""
-    url = f'{BASE_URL}/search/companies'
     params = {
         'q': query,
         'items_per_page': items_per_page
     }
 
     try:
-        response = requests.get(url, headers=get_auth_header(), params=params, timeout=10)
+        response = api_get('/search/companies', params=params)
         if response.status_code == 200:
             return response.json()
         else:
@@ -68,47 +211,128 @@ def search_companies(query, items_per_page=50):
         return None
 
 
-def search_by_sic(sic_code, limit=100):
+def iter_pages(path, params, limit, page_size=SEARCH_PAGE_SIZE,
+               size_param='items_per_page', prefetch=True):
+    """
+    Yield items from a paged search endpoint, walking start_index lazily.
+    Stops once limit items have been yielded or the results run out.
+    With prefetch, the next page is requested while the current one is consumed.
+    """
+    def fetch(start_index):
+        page_params = dict(params, start_index=start_index)
+        page_params[size_param] = min(page_size, limit - start_index)
+        try:
+            response = api_get(path, params=page_params)
+            if response.status_code == 200:
+                return response.json()
+            print(f"API Error: {response.status_code}")
+        except Exception as e:
+            print(f"Error: {e}")
+        return None
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        start_index = 0
+        page = fetch(start_index)
+        while page:
+            items = page.get('items', [])
+            total = page.get('total_results', page.get('hits', 0))
+            next_index = start_index + len(items)
+
+            more = items and next_index < limit and (not total or next_index < total)
+            upcoming = executor.submit(fetch, next_index) if more and executor else None
+
+            for item in items[:limit - start_index]:
+                yield item
+
+            if not more:
+                break
+            start_index = next_index
+            page = upcoming.result() if upcoming else fetch(start_index)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_search_companies(query, limit=100):
+    """Search for companies by name, yielding results across as many pages as needed."""
+    return iter_pages('/search/companies', {'q': query}, limit)
+
+
+def iter_advanced_search(sic_codes=None, status='active', location=None, limit=100):
+    """
+    Yield companies from the advanced search endpoint.
+    SIC, status and location filters are applied server-side, so no quota
+    is spent on companies that would be thrown away.
+    """
+    params = {}
+    if sic_codes:
+        params['sic_codes'] = ','.join(sic_codes) if isinstance(sic_codes, (list, tuple)) else sic_codes
+    if status:
+        params['company_status'] = status
+    if location:
+        params['location'] = location
+
+    for item in iter_pages('/advanced-search/companies', params, limit,
+                           page_size=ADVANCED_SEARCH_PAGE_SIZE, size_param='size'):
+        # Advanced search uses company_name where name search uses title
+        item.setdefault('title', item.get('company_name', ''))
+        yield item
+
+
+def search_by_sic(sic_code, limit=100, status='active', postcode_area=None, location=None):
     """
     Search for companies by SIC code.
-    Note: CH API doesn't have direct SIC search, so we search for the SIC description.
-    For proper SIC filtering, download bulk data from Companies House.
+    Answers from the local bulk index when one has been built (see ingest-bulk).
+    Otherwise pages through the API advanced search with server-side filters.
     """
-    # This is a workaround - proper solution is bulk data download
+    if os.path.exists(BULK_DB):
+        return search_bulk_index(sic_code, limit=limit, status=status,
+                                 postcode_area=postcode_area)
+
     sic_desc = SIC_CODES.get(sic_code, sic_code)
     print(f"Searching for SIC {sic_code}: {sic_desc}")
-    print("Note: API doesn't support direct SIC search. Consider bulk data download.")
 
-    results = search_companies(sic_desc, items_per_page=limit)
-    return results
+    return iter_advanced_search(sic_code, status=status, location=location, limit=limit)
+
+
+def search_sic_batch(sic_codes, limit=100, status='active', postcode_area=None, location=None):
+    """
+    Search several SIC codes and merge the candidates by company number.
+    Each company appears once, tagged with every code it matched, so it is
+    only enriched once however many of the codes it is registered under.
+    """
+    merged = {}
+    for sic_code in sic_codes:
+        results = search_by_sic(sic_code, limit=limit, status=status,
+                                postcode_area=postcode_area, location=location)
+        if not results:
+            continue
+
+        items = results.get('items', []) if isinstance(results, dict) else results
+        for company in items:
+            company_number = company.get('company_number', '')
+            if company_number not in merged:
+                merged[company_number] = dict(company, matched_sic=[])
+            merged[company_number]['matched_sic'].append(sic_code)
+
+    items = list(merged.values())
+    for company in items:
+        company['matched_sic'] = ', '.join(company['matched_sic'])
+
+    overlap = sum(1 for c in items if ',' in c['matched_sic'])
+    print(f"\n{len(items)} unique companies across {len(sic_codes)} SIC codes ({overlap} matched several)")
+    return {'items': items}
 
 
 def get_company(company_number):
     """Get full company details."""
-    url = f'{BASE_URL}/company/{company_number}'
-
-    try:
-        response = requests.get(url, headers=get_auth_header(), timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except:
-        return None
+    return cached_get('company', company_number, f'/company/{company_number}')
 
 
 def get_officers(company_number):
     """Get company officers (directors, etc.)."""
-    url = f'{BASE_URL}/company/{company_number}/officers'
-
-    try:
-        response = requests.get(url, headers=get_auth_header(), timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except:
-        return None
+    return cached_get('officers', company_number, f'/company/{company_number}/officers')
 
 
 def get_registered_office(company_number):
@@ -119,59 +343,207 @@ def get_registered_office(company_number):
     return None
 
 
-def build_target_list(companies, output_file='ch_targets.csv'):
-    """Build CSV target list from company search results."""
-    targets = []
+def _bulk_field(row, name):
+    """Read a bulk CSV column (header names carry stray leading spaces)."""
+    return (row.get(name) or '').strip()
 
-    items = companies.get('items', [])
-    print(f"\nProcessing {len(items)} companies...")
 
-    for company in items:
-        company_number = company.get('company_number', '')
-        name = company.get('title', '')
-        status = company.get('company_status', '')
+def _normalise_status(status):
+    """Map bulk file statuses ('Active - Proposal to Strike off') to API style ('active')."""
+    return status.split(' - ')[0].strip().lower().replace(' ', '-')
 
-        # Skip dissolved companies
-        if status == 'dissolved':
-            continue
 
-        print(f"  {name}...", end=' ')
+def get_postcode_area(postcode):
+    """Return the postcode area (leading letters), e.g. 'LS' for 'LS1 4AP'."""
+    match = re.match(r'[A-Z]{1,2}', postcode.strip().upper())
+    return match.group(0) if match else ''
 
-        # Get more details
-        details = get_company(company_number)
-        officers = get_officers(company_number)
 
-        if details:
-            address = details.get('registered_office_address', {})
-            sic = details.get('sic_codes', [])
-
-            # Get director names for email guessing
-            director_names = []
-            if officers:
-                for officer in officers.get('items', []):
-                    role = officer.get('officer_role', '')
-                    if 'director' in role.lower():
-                        director_names.append(officer.get('name', ''))
-
-            targets.append({
-                'company_name': name,
-                'company_number': company_number,
-                'status': status,
-                'address': address.get('address_line_1', ''),
-                'town': address.get('locality', ''),
-                'postcode': address.get('postal_code', ''),
-                'sic_codes': ', '.join(sic) if sic else '',
-                'directors': ', '.join(director_names[:3]),  # First 3 directors
-            })
-            print("OK")
-        else:
-            print("SKIP")
+def _open_bulk_file(path):
+    """
+    Open a bulk snapshot for reading as text.
+    Zip members are decompressed as a stream, never extracted to disk.
+    """
+    if not zipfile.is_zipfile(path):
+        return [open(path, 'r', newline='', encoding='utf-8-sig')]
+
+    archive = zipfile.ZipFile(path)
+    return [
+        io.TextIOWrapper(archive.open(name), encoding='utf-8-sig', newline='')
+        for name in archive.namelist()
+        if name.lower().endswith('.csv')
+    ]
+
+
+def _iter_bulk_rows(path):
+    """Yield (company, sic_codes) tuples from a bulk snapshot, one row at a time."""
+    for handle in _open_bulk_file(path):
+        with handle:
+            reader = csv.reader(handle)
+            header = [h.strip() for h in next(reader, [])]
+            for values in reader:
+                row = dict(zip(header, values))
+                postcode = _bulk_field(row, 'RegAddress.PostCode')
+
+                sic_codes = []
+                for i in range(1, 5):
+                    # e.g. "49410 - Freight transport by road"
+                    sic = _bulk_field(row, f'SICCode.SicText_{i}').split(' - ')[0]
+                    if sic and sic != 'None Supplied':
+                        sic_codes.append(sic)
+
+                company = (
+                    _bulk_field(row, 'CompanyNumber'),
+                    _bulk_field(row, 'CompanyName'),
+                    _normalise_status(_bulk_field(row, 'CompanyStatus')),
+                    _bulk_field(row, 'RegAddress.AddressLine1'),
+                    _bulk_field(row, 'RegAddress.PostTown'),
+                    postcode,
+                    get_postcode_area(postcode),
+                    ','.join(sic_codes),
+                )
+                yield company, sic_codes
+
+
+def ingest_bulk(paths, db_path=None):
+    """
+    Build the local SIC index from one or more bulk snapshot files.
+    Rows are streamed into SQLite in batches so memory stays flat.
+    The index is built alongside and swapped in when complete.
+    """
+    db_path = db_path or BULK_DB
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute("""
+        CREATE TABLE companies (
+            company_number TEXT PRIMARY KEY,
+            name TEXT, status TEXT, address TEXT, town TEXT,
+            postcode TEXT, postcode_area TEXT, sic_codes TEXT
+        )""")
+    conn.execute("""
+        CREATE TABLE company_sic (
+            sic_code TEXT, status TEXT, postcode_area TEXT, company_number TEXT
+        )""")
+
+    start = time.time()
+    count = 0
+    companies = []
+    sic_rows = []
+
+    def flush():
+        conn.executemany('INSERT OR REPLACE INTO companies VALUES (?, ?, ?, ?, ?, ?, ?, ?)', companies)
+        conn.executemany('INSERT INTO company_sic VALUES (?, ?, ?, ?)', sic_rows)
+        companies.clear()
+        sic_rows.clear()
+
+    for path in paths:
+        print(f"Ingesting {path}...")
+        for company, sic_codes in _iter_bulk_rows(path):
+            if not company[0]:
+                continue
+            companies.append(company)
+            for sic in sic_codes:
+                sic_rows.append((sic, company[2], company[6], company[0]))
+
+            count += 1
+            if len(companies) >= BULK_BATCH_SIZE:
+                flush()
+                if count % 500000 == 0:
+                    print(f"  {count} companies ({time.time() - start:.0f}s)")
+    flush()
+
+    # Index after loading - much faster than maintaining it per insert
+    print("Building SIC index...")
+    conn.execute('CREATE INDEX idx_sic ON company_sic (sic_code, status, postcode_area, company_number)')
+    conn.commit()
+    conn.close()
+
+    os.replace(tmp_path, db_path)
+    print(f"\nIndexed {count} companies into {db_path} in {time.time() - start:.0f}s")
+    return count
+
+
+def search_bulk_index(sic_code, limit=100, status='active', postcode_area=None, db_path=None):
+    """Query the local SIC index. Returns results shaped like search_companies."""
+    sql = """
+        SELECT c.company_number, c.name, c.status, c.address, c.town, c.postcode
+        FROM company_sic s JOIN companies c ON c.company_number = s.company_number
+        WHERE s.sic_code = ?"""
+    params = [sic_code]
+    if status:
+        sql += ' AND s.status = ?'
+        params.append(status.lower())
+    if postcode_area:
+        sql += ' AND s.postcode_area = ?'
+        params.append(postcode_area.upper())
+    sql += ' LIMIT ?'
+    params.append(limit)
+
+    conn = sqlite3.connect(db_path or BULK_DB)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
 
-        sleep(0.3)  # Rate limiting
+    items = []
+    for number, name, company_status, address, town, postcode in rows:
+        items.append({
+            'company_number': number,
+            'title': name,
+            'company_status': company_status,
+            'address_snippet': ', '.join(p for p in (address, town, postcode) if p),
+        })
+
+    print(f"Found {len(items)} companies with SIC {sic_code} in local index")
+    return {'items': items, 'total_results': len(items)}
+
+
+def build_target_list(companies, output_file='ch_targets.csv', workers=MAX_WORKERS, store=None):
+    """
+    Build CSV target list from company search results.
+    Accepts a search results dict or an iterable of companies (e.g. from
+    iter_search_companies), so enrichment starts as soon as results arrive.
+    Company and officer lookups run concurrently on a bounded worker pool,
+    paced by the shared rate limiter. Rows are also recorded in the
+    target store, if given, as they are built.
+    """
+    targets = []
+
+    items = companies.get('items', []) if isinstance(companies, dict) else companies
+    print("\nProcessing companies...")
+
+    def finish(lookup):
+        company, details_future, officers_future = lookup
+        if add_target(targets, company, details_future.result(), officers_future.result()) and store:
+            store.add_company(targets[-1])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for company in items:
+            # Skip dissolved companies before spending any requests on them
+            if company.get('company_status', '') == 'dissolved':
+                continue
+
+            company_number = company.get('company_number', '')
+            pending.append((company,
+                            executor.submit(get_company, company_number),
+                            executor.submit(get_officers, company_number)))
+
+            # Keep a bounded window of lookups in flight, reporting in order
+            while len(pending) > workers * 4:
+                finish(pending.popleft())
+
+        while pending:
+            finish(pending.popleft())
 
     # Save to CSV
     if targets:
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        with stats.timer('csv'), open(output_file, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=targets[0].keys())
             writer.writeheader()
             writer.writerows(targets)
@@ -181,6 +553,281 @@ def build_target_list(companies, output_file='ch_targets.csv'):
     return targets
 
 
+def add_target(targets, company, details, officers):
+    """Append a target row built from a company's details and officers. Returns True if added."""
+    company_number = company.get('company_number', '')
+    name = company.get('title', '')
+    status = company.get('company_status', '')
+
+    print(f"  {name}...", end=' ')
+
+    if details:
+        address = details.get('registered_office_address', {})
+        sic = details.get('sic_codes', [])
+
+        # Get director names for email guessing
+        director_names = []
+        if officers:
+            for officer in officers.get('items', []):
+                role = officer.get('officer_role', '')
+                if 'director' in role.lower():
+                    director_names.append(officer.get('name', ''))
+
+        targets.append({
+            'company_name': name,
+            'company_number': company_number,
+            'status': status,
+            'address': address.get('address_line_1', ''),
+            'town': address.get('locality', ''),
+            'postcode': address.get('postal_code', ''),
+            'sic_codes': ', '.join(sic) if sic else '',
+            # First 3 directors; '; ' since CH names are "SURNAME, Forenames"
+            'directors': '; '.join(director_names[:3]),
+        })
+        if 'matched_sic' in company:
+            targets[-1]['matched_sic'] = company['matched_sic']
+        print("OK")
+        return True
+    else:
+        print("SKIP")
+        return False
+
+
+def load_checkpoint(path=SYNC_CHECKPOINT):
+    """Load the last processed timepoint for each stream."""
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_checkpoint(checkpoint, path=SYNC_CHECKPOINT):
+    """Write the checkpoint atomically so a crash never leaves it half written."""
+    with open(path + '.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(path + '.tmp', path)
+
+
+def _read_lines(raw):
+    """
+    Yield lines from a urllib3 response as soon as each one arrives.
+    iter_lines() reads fixed-size chunks, so complete events can sit in
+    a part-filled chunk until more data comes - or never, if the stream
+    goes quiet. read1() returns whatever has arrived instead.
+    """
+    pending = b''
+    while True:
+        chunk = raw.read1(65536, decode_content=True)
+        if not chunk:
+            if pending:
+                yield pending
+            return
+        *lines, pending = (pending + chunk).split(b'\n')
+        yield from lines
+
+
+def iter_stream_events(stream, timepoint=None, idle_timeout=STREAM_IDLE_TIMEOUT):
+    """
+    Yield events from a Companies House streaming API endpoint.
+    Resumes after timepoint. Ends once no event has arrived for
+    idle_timeout seconds, i.e. we have caught up - the service keeps
+    sending blank heartbeat lines while idle, so this is timed here
+    rather than left to the socket timeout. Any other failure (refused,
+    DNS, HTTP error, dropped connection) raises requests.RequestException.
+    """
+    if not STREAM_KEY:
+        print("Warning: No COMPANIES_HOUSE_STREAM_KEY set")
+
+    params = {'timepoint': timepoint} if timepoint else None
+    response = stats.get(requests.get, f'{STREAM_URL}/{stream}', params=params, auth=(STREAM_KEY, ''),
+                         stream=True, timeout=(10, idle_timeout))
+    response.raise_for_status()
+
+    last_event = time.monotonic()
+    try:
+        for line in _read_lines(response.raw):
+            if line.strip():
+                stats.add_bytes(response.url, len(line))
+                stats.count('stream_events')
+                yield json.loads(line)
+                last_event = time.monotonic()
+            elif time.monotonic() - last_event >= idle_timeout:
+                return  # Only heartbeats for idle_timeout seconds - caught up
+    except ReadTimeoutError:
+        return  # Not even a heartbeat for idle_timeout seconds - caught up
+    except HTTPError as e:
+        # Reading the raw response skips requests' own wrapping of these
+        raise requests.ConnectionError(e, response=response)
+    finally:
+        response.close()
+
+
+def _company_number_from_uri(uri):
+    """'/company/01234567/appointments/abc' -> '01234567'."""
+    parts = uri.strip('/').split('/')
+    return parts[1] if len(parts) > 1 and parts[0] == 'company' else ''
+
+
+def load_target_files(paths):
+    """Read target CSVs into {path: (fieldnames, rows)} plus an index by company number."""
+    files = {}
+    index = {}
+    for path in paths:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            rows = list(reader)
+        files[path] = (reader.fieldnames, rows)
+        for row in rows:
+            index.setdefault(row.get('company_number', ''), []).append((path, row))
+    return files, index
+
+
+def apply_company_event(event, index, bulk_conn):
+    """Apply a company-profile change to target rows, cache and bulk index."""
+    data = event.get('data', {})
+    company_number = data.get('company_number') or _company_number_from_uri(event.get('resource_uri', ''))
+    deleted = event.get('event', {}).get('type') == 'deleted'
+    touched = set()
+
+    for path, row in index.get(company_number, []):
+        if deleted:
+            row['_deleted'] = True
+        else:
+            address = data.get('registered_office_address', {})
+            row['status'] = data.get('company_status', row.get('status', ''))
+            row['address'] = address.get('address_line_1', row.get('address', ''))
+            row['town'] = address.get('locality', row.get('town', ''))
+            row['postcode'] = address.get('postal_code', row.get('postcode', ''))
+            row['sic_codes'] = ', '.join(data.get('sic_codes', [])) or row.get('sic_codes', '')
+        touched.add(path)
+
+    # Keep cached profiles current rather than letting them go stale
+    if deleted:
+        get_cache().delete('company', company_number)
+    elif index.get(company_number) or get_cache().get('company', company_number) is not None:
+        get_cache().set('company', company_number, data)
+
+    if bulk_conn is not None and not deleted:
+        address = data.get('registered_office_address', {})
+        postcode = address.get('postal_code', '')
+        status = data.get('company_status', '')
+        cursor = bulk_conn.execute(
+            'UPDATE companies SET status = ?, address = ?, town = ?, postcode = ?, postcode_area = ? '
+            'WHERE company_number = ?',
+            (status, address.get('address_line_1', ''), address.get('locality', ''),
+             postcode, get_postcode_area(postcode), company_number))
+        if cursor.rowcount:
+            bulk_conn.execute('UPDATE company_sic SET status = ?, postcode_area = ? WHERE company_number = ?',
+                              (status, get_postcode_area(postcode), company_number))
+
+    return touched
+
+
+def apply_officer_event(event, index):
+    """Apply an officer appointment change to the directors column of target rows."""
+    data = event.get('data', {})
+    company_number = _company_number_from_uri(event.get('resource_uri', ''))
+    name = data.get('name', '')
+    is_director = 'director' in data.get('officer_role', '').lower()
+    removed = event.get('event', {}).get('type') == 'deleted' or data.get('resigned_on')
+    touched = set()
+
+    # Officer list changed - next lookup must refetch it
+    get_cache().delete('officers', company_number)
+
+    if not name or not is_director:
+        return touched
+
+    for path, row in index.get(company_number, []):
+        directors = [d.strip() for d in row.get('directors', '').split('; ') if d.strip()]
+        if removed and name in directors:
+            directors.remove(name)
+        elif not removed and name not in directors and len(directors) < 3:
+            directors.append(name)
+        else:
+            continue
+        row['directors'] = '; '.join(directors)
+        touched.add(path)
+
+    return touched
+
+
+def sync(target_files, max_events=None, idle_timeout=STREAM_IDLE_TIMEOUT):
+    """
+    Apply company and officer changes from the streaming API to local data.
+    Resumes from the checkpointed timepoint of each stream. Returns the
+    checkpoint, or None if a stream failed (events read before the
+    failure are still applied and checkpointed).
+    """
+    checkpoint = load_checkpoint()
+    files, index = load_target_files(target_files)
+    bulk_conn = sqlite3.connect(BULK_DB) if os.path.exists(BULK_DB) else None
+    dirty = set()
+    failed = []
+
+    print(f"Syncing {len(index)} target companies from {len(files)} file(s)...")
+
+    for stream, kind in (('companies', 'company-profile'), ('officers', 'company-officers')):
+        start = time.time()
+        count = 0
+        applied = 0
+
+        try:
+            for event in iter_stream_events(stream, checkpoint.get(stream), idle_timeout):
+                if event.get('resource_kind') == kind:
+                    if kind == 'company-profile':
+                        touched = apply_company_event(event, index, bulk_conn)
+                    else:
+                        touched = apply_officer_event(event, index)
+                    dirty.update(touched)
+                    applied += bool(touched)
+
+                count += 1
+                checkpoint[stream] = event.get('event', {}).get('timepoint', checkpoint.get(stream))
+                if count % 1000 == 0:
+                    if bulk_conn is not None:
+                        bulk_conn.commit()
+                    save_checkpoint(checkpoint)
+                if max_events and count >= max_events:
+                    break
+        except requests.RequestException as e:
+            print(f"  {stream}: stream error after {count} events: {e}")
+            failed.append(stream)
+
+        if bulk_conn is not None:
+            bulk_conn.commit()
+        save_checkpoint(checkpoint)
+
+        elapsed = max(time.time() - start, 0.001)
+        print(f"  {stream}: {count} events, {applied} applied to targets "
+              f"({count / elapsed:.0f} events/s, timepoint {checkpoint.get(stream)})")
+
+    if bulk_conn is not None:
+        bulk_conn.close()
+
+    # Rewrite only the target files that actually changed
+    for path in dirty:
+        fieldnames, rows = files[path]
+        with stats.timer('csv'), open(path + '.tmp', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(row for row in rows if not row.get('_deleted'))
+        os.replace(path + '.tmp', path)
+        print(f"  Updated {path}")
+
+    if failed:
+        print(f"Stream(s) failed: {', '.join(failed)} - run sync again to resume")
+        return None
+    return checkpoint
+
+
+def campaign_arg():
+    """Value of --campaign, if given (defaults to the current ISO week in the store)."""
+    if '--campaign' in sys.argv:
+        return sys.argv[sys.argv.index('--campaign') + 1]
+    return None
+
+
 def main():
     if len(sys.argv) < 2:
         print(__doc__)
@@ -191,39 +838,128 @@ def main():
 
     command = sys.argv[1]
 
+    if '--refresh' in sys.argv:
+        global REFRESH
+        REFRESH = True
+        sys.argv.remove('--refresh')
+
     if command == 'search':
         if len(sys.argv) < 3:
-            print("Usage: python companies_house.py search <query>")
+            print("Usage: python companies_house.py search <query> [--limit N]")
             sys.exit(1)
 
         query = sys.argv[2]
-        print(f"Searching for: {query}")
+        limit = 10
 
-        results = search_companies(query)
-        if results:
-            items = results.get('items', [])
-            print(f"\nFound {len(items)} results:\n")
-            for item in items[:10]:
-                print(f"  {item.get('company_number')}: {item.get('title')}")
-                print(f"    Status: {item.get('company_status')}")
-                print(f"    Address: {item.get('address_snippet', 'N/A')}")
-                print()
+        if '--limit' in sys.argv:
+            idx = sys.argv.index('--limit')
+            limit = int(sys.argv[idx + 1])
+
+        print(f"Searching for: {query}\n")
+
+        # Pages are fetched as the results are printed, only as many as --limit needs
+        count = 0
+        for item in iter_search_companies(query, limit=limit):
+            print(f"  {item.get('company_number')}: {item.get('title')}")
+            print(f"    Status: {item.get('company_status')}")
+            print(f"    Address: {item.get('address_snippet', 'N/A')}")
+            print()
+            count += 1
+        print(f"Found {count} results")
 
     elif command == 'search-sic':
         if len(sys.argv) < 3:
-            print("Usage: python companies_house.py search-sic <sic_code> [--limit N]")
+            print("Usage: python companies_house.py search-sic <sic_code> [--limit N] [--area LS] [--location Leeds]")
             sys.exit(1)
 
         sic_code = sys.argv[2]
         limit = 50
+        area = None
+        location = None
 
         if '--limit' in sys.argv:
             idx = sys.argv.index('--limit')
             limit = int(sys.argv[idx + 1])
 
-        results = search_by_sic(sic_code, limit=limit)
+        if '--area' in sys.argv:
+            idx = sys.argv.index('--area')
+            area = sys.argv[idx + 1]
+
+        if '--location' in sys.argv:
+            idx = sys.argv.index('--location')
+            location = sys.argv[idx + 1]
+
+        results = search_by_sic(sic_code, limit=limit, postcode_area=area, location=location)
         if results:
-            build_target_list(results, f'sic_{sic_code}_targets.csv')
+            store = TargetStore(campaign=campaign_arg())
+            try:
+                build_target_list(results, f'sic_{sic_code}_targets.csv', store=store)
+            finally:
+                store.close()
+
+    elif command == 'search-sic-batch':
+        if len(sys.argv) < 3:
+            print("Usage: python companies_house.py search-sic-batch <sic_code> [<sic_code> ...|all] [--limit N]")
+            sys.exit(1)
+
+        limit = 50
+        area = None
+        location = None
+
+        if '--limit' in sys.argv:
+            idx = sys.argv.index('--limit')
+            limit = int(sys.argv.pop(idx + 1))
+            sys.argv.pop(idx)
+
+        if '--area' in sys.argv:
+            idx = sys.argv.index('--area')
+            area = sys.argv.pop(idx + 1)
+            sys.argv.pop(idx)
+
+        if '--location' in sys.argv:
+            idx = sys.argv.index('--location')
+            location = sys.argv.pop(idx + 1)
+            sys.argv.pop(idx)
+
+        campaign = campaign_arg()
+        if campaign:
+            idx = sys.argv.index('--campaign')
+            del sys.argv[idx:idx + 2]
+
+        sic_codes = list(SIC_CODES) if sys.argv[2:] == ['all'] else sys.argv[2:]
+        results = search_sic_batch(sic_codes, limit=limit, postcode_area=area, location=location)
+        if results['items']:
+            store = TargetStore(campaign=campaign)
+            try:
+                build_target_list(results, 'sic_batch_targets.csv', store=store)
+            finally:
+                store.close()
+
+    elif command == 'ingest-bulk':
+        if len(sys.argv) < 3:
+            print("Usage: python companies_house.py ingest-bulk <BasicCompanyData.zip> [more.zip ...]")
+            sys.exit(1)
+
+        ingest_bulk(sys.argv[2:])
+
+    elif command == 'sync':
+        max_events = None
+        idle_timeout = STREAM_IDLE_TIMEOUT
+
+        if '--max-events' in sys.argv:
+            idx = sys.argv.index('--max-events')
+            max_events = int(sys.argv.pop(idx + 1))
+            sys.argv.pop(idx)
+
+        if '--idle' in sys.argv:
+            idx = sys.argv.index('--idle')
+            idle_timeout = float(sys.argv.pop(idx + 1))
+            sys.argv.pop(idx)
+
+        # Default to every target list build_target_list has written here
+        target_files = sys.argv[2:] or sorted(glob.glob('ch_targets.csv') + glob.glob('sic_*_targets.csv'))
+        if sync(target_files, max_events=max_events, idle_timeout=idle_timeout) is None:
+            sys.exit(1)
 
     elif command == 'get-company':
         if len(sys.argv) < 3:
@@ -266,4 +1002,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    run_main(main, 'companies_house')
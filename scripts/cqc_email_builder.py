@@ -5,22 +5,52 @@ Downloads CQC data and builds email target list
 
 Usage:
     python cqc_email_builder.py download
+    python cqc_email_builder.py sync cqc_care_homes.csv
+    python cqc_email_builder.py enrich cqc_care_homes.csv
     python cqc_email_builder.py process cqc_data.csv
     python cqc_email_builder.py build-list cqc_data.csv --max 500
+    python cqc_email_builder.py build-list cqc_data.csv --near "LS1 4AP" --radius 30
+    python cqc_email_builder.py process cqc_data.csv --region "Yorkshire and The Humber"
 """
 
+import os
 import re
 import sys
 import csv
 import json
+import hashlib
+import math
 import time
+import shutil
+import threading
 import requests
+from collections import deque
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from urllib.parse import urlparse
-from email_scraper import scrape_website_for_emails, guess_email_patterns
-
-# CQC data portal URLs
-CQC_LOCATIONS_URL = "https://api.cqc.org.uk/public/v1/locations"
+from requests.adapters import HTTPAdapter
+from disk_cache import DiskCache
+from run_stats import stats, run_main
+from target_store import TargetStore
+from postcode_index import PostcodeIndex, filter_by_location
+from email_scraper import (scrape_website_for_emails, guess_email_patterns, registrable_domain,
+                           site_key, on_shared_host)
+
+# CQC data portal URLs (override CQC_API_URL to point at a local fake server)
+CQC_API_URL = os.environ.get('CQC_API_URL', 'https://api.cqc.org.uk/public/v1')
+CQC_LOCATIONS_URL = f"{CQC_API_URL}/locations"
+CQC_CHANGES_URL = f"{CQC_API_URL}/changes/location"
+PER_PAGE = 500
+DOWNLOAD_WORKERS = 4
+ENRICH_WORKERS = 8
+# Location detail requests per second, shared by all enrich/sync workers
+DETAILS_RATE = float(os.environ.get('CQC_REQUESTS_PER_SECOND', 4))
+BUILD_WORKERS = 8
+DEFAULT_RADIUS = 25  # Miles, when --near is given without --radius
+
+# Location details cache - doubles as the enrich checkpoint
+CACHE_FILE = os.environ.get('CQC_CACHE', 'cqc_cache.db')
+LOCATION_TTL = 7 * 86400
 
 # Headers for requests
 HEADERS = {
@@ -28,72 +58,403 @@ HEADERS = {
 }
 
 
-def download_cqc_data(output_file='cqc_care_homes.csv', max_pages=None):
+class RequestPacer:
+    """Spaces requests from all worker threads at least 1/rate seconds apart."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.next_slot = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        stats.sleep(slot - now, 'rate_limit')
+
+
+_session = None
+_cache = None
+_lock = threading.Lock()
+details_pacer = RequestPacer(DETAILS_RATE)
+
+
+def get_session():
+    """Shared pooled session for all CQC API calls."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=ENRICH_WORKERS * 2)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def get_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = DiskCache(CACHE_FILE)
+        return _cache
+
+
+def fetch_locations_page(page, per_page=PER_PAGE):
+    """Fetch one page of the care home listing."""
+    url = f"{CQC_LOCATIONS_URL}?page={page}&perPage={per_page}&careHome=Y"
+    response = stats.get(get_session().get, url, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def _page_path(pages_dir, page):
+    return os.path.join(pages_dir, f'page_{page:05d}.ndjson')
+
+
+def save_page(pages_dir, page, locations):
+    """Write a page as NDJSON. The rename makes a page file's presence the checkpoint."""
+    path = _page_path(pages_dir, page)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        for loc in locations:
+            f.write(json.dumps(loc) + '\n')
+    os.replace(path + '.tmp', path)
+
+
+def iter_saved_locations(pages_dir, total_pages):
+    """Yield locations from saved pages in page order, one at a time."""
+    for page in range(1, total_pages + 1):
+        path = _page_path(pages_dir, page)
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def download_cqc_data(output_file='cqc_care_homes.csv', max_pages=None, workers=DOWNLOAD_WORKERS):
     """
     Download care home data from CQC API.
     Free, no API key required.
+    Page 1 gives the total; remaining pages are fetched in parallel and
+    streamed to disk, so an interrupted download resumes where it stopped.
     """
     print("Downloading CQC care home data...")
 
-    all_locations = []
-    page = 1
-    per_page = 500
+    started = utc_timestamp()
+    pages_dir = os.path.splitext(output_file)[0] + '_pages'
+    manifest_path = os.path.join(pages_dir, 'manifest.json')
+
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('complete'):
+            # Last download finished - start a fresh one
+            shutil.rmtree(pages_dir)
+            manifest = {}
+        else:
+            print(f"  Resuming download in {pages_dir}/")
+    os.makedirs(pages_dir, exist_ok=True)
 
-    while True:
-        if max_pages and page > max_pages:
-            break
+    if not manifest:
+        try:
+            data = fetch_locations_page(1)
+        except Exception as e:
+            print(f"  Error on page 1: {e}")
+            return 0
+
+        locations = data.get('locations', [])
+        save_page(pages_dir, 1, locations)
+        total = data.get('total', len(locations))
+        manifest = {
+            'started': started,
+            'total': total,
+            'total_pages': data.get('totalPages') or max(1, math.ceil(total / PER_PAGE)),
+        }
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+        print(f"  Page 1: {len(locations)} locations (total: {total})")
+
+    total_pages = manifest['total_pages']
+    if max_pages:
+        total_pages = min(total_pages, max_pages)
+
+    def fetch_and_save(page):
+        data = fetch_locations_page(page)
+        locations = data.get('locations', [])
+        save_page(pages_dir, page, locations)
+        stats.sleep(0.5)  # Rate limiting (per worker)
+        return len(locations)
+
+    remaining = [p for p in range(1, total_pages + 1) if not os.path.exists(_page_path(pages_dir, p))]
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_and_save, page): page for page in remaining}
+        for done, future in enumerate(as_completed(futures), 1):
+            page = futures[future]
+            try:
+                count = future.result()
+                print(f"  Page {page}: {count} locations ({done}/{len(remaining)})")
+            except Exception as e:
+                print(f"  Error on page {page}: {e}")
+                failed.append(page)
+
+    if failed:
+        print(f"\n{len(failed)} page(s) failed - run download again to resume")
+    elif total_pages < manifest['total_pages']:
+        # A sample is not the full register: sync must not build on it
+        print(f"\nDownloaded {total_pages} of {manifest['total_pages']} pages - "
+              f"run download without a page limit before using sync")
+        if os.path.exists(_sync_state_path(output_file)):
+            os.remove(_sync_state_path(output_file))
+    else:
+        manifest['complete'] = True
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+        # Changes after the download started are picked up by sync
+        save_sync_state(output_file, manifest['started'])
+
+    # Save to CSV, streaming from the page files
+    fields = set()
+    for loc in iter_saved_locations(pages_dir, total_pages):
+        fields.update(loc.keys())
+    fields = sorted(fields)
+
+    count = 0
+    if fields:
+        with stats.timer('csv'), open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for loc in iter_saved_locations(pages_dir, total_pages):
+                writer.writerow(loc)
+                count += 1
 
-        url = f"{CQC_LOCATIONS_URL}?page={page}&perPage={per_page}&careHome=Y"
+        print(f"\nSaved {count} care homes to {output_file}")
 
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=30)
-            data = response.json()
+    return count
 
-            locations = data.get('locations', [])
-            if not locations:
-                break
 
-            all_locations.extend(locations)
-            print(f"  Page {page}: {len(locations)} locations (total: {len(all_locations)})")
+def get_location_details(location_id, refresh=False, missing=None):
+    """
+    Get detailed info for a specific location (cached on disk).
+    Returns missing if CQC has no such location (404), None if the
+    fetch failed.
+    """
+    if not refresh:
+        cached = get_cache().get('location', location_id, ttl=LOCATION_TTL)
+        if cached is not None:
+            stats.count('cache_hits')
+            return cached
 
-            # Check if more pages
-            total = data.get('total', 0)
-            if len(all_locations) >= total:
-                break
+    url = f"{CQC_LOCATIONS_URL}/{location_id}"
+    details_pacer.wait()  # Rate limiting (cache hits don't wait)
+    try:
+        response = stats.get(get_session().get, url, timeout=10)
+        if response.status_code == 200:
+            return get_cache().set('location', location_id, response.json())
+        if response.status_code == 404:
+            get_cache().delete('location', location_id)
+            return missing
+        return None
+    except:
+        return None
 
-            page += 1
-            time.sleep(0.5)  # Rate limiting
 
-        except Exception as e:
-            print(f"  Error on page {page}: {e}")
-            break
+def enrich_cqc_data(data_file='cqc_care_homes.csv', output_file=None, workers=ENRICH_WORKERS):
+    """
+    Fill in website, phone, address and rating columns the listing omits.
+    Details are fetched concurrently and cached as they arrive, so an
+    interrupted run picks up where it stopped. Writes in place by default.
+    """
+    output_file = output_file or data_file
+    print(f"Enriching {data_file}...")
+
+    with open(data_file, 'r', newline='', encoding='utf-8-sig') as f:
+        fields = csv.DictReader(f).fieldnames or []
+    fields = fields + [k for k in location_to_row({}) if k not in fields]
+
+    counts = {'rows': 0, 'enriched': 0, 'with_website': 0}
+
+    def write(writer, row, future):
+        details = future.result() if future else None
+        if details and details.get('locationId'):
+            enriched = location_to_row(details)
+            # Keep anything the listing already had
+            row.update({k: v for k, v in enriched.items() if v or not row.get(k)})
+            counts['enriched'] += 1
+        if row.get('website'):
+            counts['with_website'] += 1
+        with stats.timer('csv'):
+            writer.writerow(row)
+        counts['rows'] += 1
+        if counts['rows'] % 1000 == 0:
+            print(f"  {counts['rows']} rows ({counts['enriched']} enriched)")
+
+    with open(data_file, 'r', newline='', encoding='utf-8-sig') as src, \
+            open(output_file + '.tmp', 'w', newline='', encoding='utf-8') as dst, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        writer = csv.DictWriter(dst, fieldnames=fields)
+        writer.writeheader()
 
-    # Save to CSV
-    if all_locations:
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            # Get all possible fields
-            fields = set()
-            for loc in all_locations:
-                fields.update(loc.keys())
-            fields = sorted(list(fields))
+        pending = deque()
+        for row in csv.DictReader(src):
+            location_id = row.get('locationId', '')
+            needs_details = location_id and not row.get('website')
+            pending.append((row, executor.submit(get_location_details, location_id) if needs_details else None))
 
-            writer = csv.DictWriter(f, fieldnames=fields)
-            writer.writeheader()
-            writer.writerows(all_locations)
+            # Bounded window of lookups in flight, written in input order
+            while len(pending) > workers * 4:
+                write(writer, *pending.popleft())
 
-        print(f"\nSaved {len(all_locations)} care homes to {output_file}")
+        while pending:
+            write(writer, *pending.popleft())
 
-    return all_locations
+    os.replace(output_file + '.tmp', output_file)
+    print(f"\nEnriched {counts['enriched']} of {counts['rows']} rows "
+          f"({counts['with_website']} now have a website) -> {output_file}")
+    return counts
 
 
-def get_location_details(location_id):
-    """Get detailed info for a specific location."""
-    url = f"{CQC_LOCATIONS_URL}/{location_id}"
+def location_to_row(details):
+    """Flatten a location details response into CSV columns process_cqc_csv reads."""
+    ratings = details.get('currentRatings') or {}
+    return {
+        'locationId': details.get('locationId', ''),
+        'locationName': details.get('name', ''),
+        'postalCode': details.get('postalCode', ''),
+        'website': details.get('website', ''),
+        'mainPhoneNumber': details.get('mainPhoneNumber', ''),
+        'postalAddressLine1': details.get('postalAddressLine1', ''),
+        'postalAddressTownCity': details.get('postalAddressTownCity', ''),
+        'providerId': details.get('providerId', ''),
+        'overallRating': ratings.get('overall', {}).get('rating', ''),
+    }
+
+
+def utc_timestamp():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _sync_state_path(data_file):
+    return os.path.splitext(data_file)[0] + '_sync.json'
+
+
+def load_sync_state(data_file):
+    """Return the high-water mark of the last download or sync, if any."""
+    path = _sync_state_path(data_file)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f).get('last_sync')
+    return None
+
+
+def save_sync_state(data_file, timestamp):
+    path = _sync_state_path(data_file)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'last_sync': timestamp}, f)
+    os.replace(path + '.tmp', path)
+
+
+def get_changed_locations(since, until):
+    """List IDs of locations changed between two timestamps (all pages)."""
+    changed = []
+    page = 1
+    while True:
+        params = {'startTimestamp': since, 'endTimestamp': until, 'page': page, 'perPage': 1000}
+        response = stats.get(get_session().get, CQC_CHANGES_URL, params=params, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+
+        changed.extend(data.get('changes', []))
+        if page >= data.get('totalPages', 1):
+            break
+        page += 1
+        stats.sleep(0.5)  # Rate limiting
+
+    return changed
+
+
+def sync_cqc_data(data_file='cqc_care_homes.csv', since=None, workers=DOWNLOAD_WORKERS):
+    """
+    Bring a downloaded dataset up to date using the CQC changes listing.
+    Only changed locations are re-fetched; they are merged into the CSV
+    and the new high-water mark is recorded. If any could not be fetched
+    the mark stays put, so the next sync retries them (locations CQC no
+    longer has at all are dropped, not retried). Returns the number
+    of rows changed, or None if the sync was incomplete.
+    """
+    since = since or load_sync_state(data_file)
+    if not since:
+        print(f"No sync state for {data_file} - run a full download first or pass --since")
+        return None
+
+    until = utc_timestamp()
+    print(f"Syncing {data_file}: changes {since} -> {until}")
+
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        return response.json()
-    except:
+        changed = get_changed_locations(since, until)
+    except Exception as e:
+        print(f"  Error listing changes: {e}")
+        return None
+    print(f"  {len(changed)} changed locations")
+
+    updates = {}
+    deleted = set()
+    failed = []
+    gone = object()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for location_id, details in zip(changed, executor.map(
+                lambda lid: get_location_details(lid, refresh=True, missing=gone), changed)):
+            if details is gone:
+                deleted.add(location_id)  # No longer listed by CQC at all
+            elif details and details.get('locationId'):
+                updates[details['locationId']] = details
+            else:
+                failed.append(location_id)
+
+    # Merge: replace changed rows, drop deleted/deregistered/non care homes, append new ones
+    with open(data_file, 'r', newline='', encoding='utf-8-sig') as f:
+        fields = csv.DictReader(f).fieldnames or []
+    fields = fields + [k for k in location_to_row({}) if k not in fields]
+
+    replaced = removed = 0
+    with stats.timer('csv'), open(data_file, 'r', newline='', encoding='utf-8-sig') as src, \
+            open(data_file + '.tmp', 'w', newline='', encoding='utf-8') as dst:
+        writer = csv.DictWriter(dst, fieldnames=fields)
+        writer.writeheader()
+
+        for row in csv.DictReader(src):
+            if row.get('locationId', '') in deleted:
+                removed += 1
+                continue
+            details = updates.pop(row.get('locationId', ''), None)
+            if details is None:
+                writer.writerow(row)
+            elif details.get('registrationStatus') == 'Registered' and details.get('careHome') == 'Y':
+                row.update(location_to_row(details))
+                writer.writerow(row)
+                replaced += 1
+            else:
+                removed += 1
+
+        added = 0
+        for details in updates.values():
+            if details.get('registrationStatus') == 'Registered' and details.get('careHome') == 'Y':
+                writer.writerow(location_to_row(details))
+                added += 1
+
+    os.replace(data_file + '.tmp', data_file)
+    print(f"  Updated {replaced}, added {added}, removed {removed}")
+
+    if failed:
+        print(f"  {len(failed)} changed location(s) could not be fetched - sync state left at {since}, "
+              f"run sync again to retry")
         return None
+    save_sync_state(data_file, until)
+    return replaced + added + removed
 
 
 def process_cqc_csv(filepath, rating_filter=None):
@@ -103,7 +464,7 @@ def process_cqc_csv(filepath, rating_filter=None):
     """
     results = []
 
-    with open(filepath, 'r', encoding='utf-8-sig') as f:
+    with stats.timer('csv'), open(filepath, 'r', encoding='utf-8-sig') as f:
         reader = csv.DictReader(f)
 
         for row in reader:
@@ -152,115 +513,328 @@ def process_cqc_csv(filepath, rating_filter=None):
     return results
 
 
-def build_email_list(cqc_data, max_targets=500, scrape_websites=True):
+def find_emails(home, scrape_websites=True):
     """
-    Build email target list from CQC data.
-    Tries website scraping first, then falls back to pattern guessing.
+    Find emails for one care home: scrape its website, else guess generic ones.
+    Returns (emails, source, note).
     """
-    targets = []
+    website = home.get('website', '')
+    domain = registrable_domain(website)
 
-    print(f"\nBuilding email list from {len(cqc_data)} care homes...")
-    print(f"Target: {max_targets} emails\n")
+    # Try scraping website first
+    if domain and scrape_websites:
+        scraped = scrape_domain(website, site_key(website))
+        if scraped:
+            return scraped, 'scraped', f"SCRAPED: {len(scraped)}"
 
-    for i, home in enumerate(cqc_data):
-        if len(targets) >= max_targets:
-            break
+    # Fall back to domain guessing - not on a platform's domain (facebook.com, wixsite.com)
+    if domain and not on_shared_host(website):
+        # Generate patterns for generic emails
+        guessed = [
+            f'info@{domain}',
+            f'contact@{domain}',
+            f'enquiries@{domain}',
+            f'manager@{domain}',
+            f'admin@{domain}',
+            f'office@{domain}',
+        ]
+        return guessed[:2], 'guessed', f"GUESSED: {domain}"  # Just take info@ and contact@
 
-        name = home.get('name', '')
-        website = home.get('website', '')
-        rating = home.get('rating', '')
+    return [], 'none', ''
 
-        if not name:
-            continue
 
-        print(f"[{i+1}] {name[:50]}...", end=' ')
+_scraped_domains = {}
 
-        emails_found = []
-        source = 'none'
 
-        # Try scraping website first
-        if website and scrape_websites:
-            try:
-                scraped = scrape_website_for_emails(website)
-                if scraped:
-                    emails_found = scraped
-                    source = 'scraped'
-                    print(f"SCRAPED: {len(scraped)}", end=' ')
-            except Exception as e:
-                pass
-
-        # Fall back to domain guessing
-        if not emails_found and website:
-            domain = website.lower()
-            if domain.startswith('http'):
-                domain = urlparse(domain).netloc
-            if domain.startswith('www.'):
-                domain = domain[4:]
-
-            if domain:
-                # Generate patterns for generic emails
-                guessed = [
-                    f'info@{domain}',
-                    f'contact@{domain}',
-                    f'enquiries@{domain}',
-                    f'manager@{domain}',
-                    f'admin@{domain}',
-                    f'office@{domain}',
-                ]
-                emails_found = guessed[:2]  # Just take info@ and contact@
-                source = 'guessed'
-                print(f"GUESSED: {domain}", end=' ')
-
-        if emails_found:
-            for email in emails_found:
-                targets.append({
-                    'care_home': name,
-                    'email': email,
-                    'website': website,
-                    'rating': rating,
-                    'town': home.get('town', ''),
-                    'phone': home.get('phone', ''),
-                    'source': source
-                })
-            print("OK")
-        else:
-            print("SKIP")
+def scrape_domain(website, key):
+    """
+    Scrape a site once per run, however many locations point at it (key is
+    its site_key). Concurrent callers for the same site wait for the first
+    one's result.
+    """
+    with _lock:
+        result = _scraped_domains.get(key)
+        owner = result is None
+        if owner:
+            result = _scraped_domains[key] = Future()
+
+    if owner:
+        try:
+            result.set_result(scrape_website_for_emails(website))
+        except Exception as e:
+            result.set_result([])
+    return result.result()
 
-        time.sleep(0.3)  # Rate limiting
+
+def fill_provider_websites(cqc_data):
+    """
+    Give locations without a website their provider's group website,
+    when all the provider's other locations share one domain.
+    """
+    provider_domains = {}
+    for home in cqc_data:
+        if home.get('provider_id') and home.get('website'):
+            provider_domains.setdefault(home['provider_id'], {})[site_key(home['website'])] = home['website']
+
+    filled = 0
+    for home in cqc_data:
+        sites = provider_domains.get(home.get('provider_id'))
+        if not home.get('website') and sites and len(sites) == 1:
+            home['website'] = next(iter(sites.values()))
+            filled += 1
+    return filled
+
+
+def file_digest(path):
+    """sha256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BuildJournal:
+    """
+    Append-only record of homes already processed by build-list.
+    One JSON line per home, flushed to disk as soon as it is known, so a
+    crashed or interrupted run can be resumed without rescraping.
+    The first line is the scope (campaign and input file) the journal
+    belongs to; a journal from another scope is moved aside, not replayed.
+    """
+
+    def __init__(self, path, scope=None):
+        self.path = path
+        self.done = {}
+        sites = {}
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                header = f.readline()
+                try:
+                    found_scope = json.loads(header).get('scope')
+                except (ValueError, AttributeError):
+                    found_scope = None
+                if found_scope == scope:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue  # Partial last line from a crash
+                        self.done[entry['key']] = (entry['emails'], entry['source'], entry['note'])
+                        if entry.get('site'):
+                            sites[entry['site']] = entry['emails'] if entry['source'] == 'scraped' else []
+
+            if found_scope != scope:
+                os.replace(path, path + '.old')
+                print(f"{path} is from another campaign or input file - moved to {path}.old")
+
+        # Seed the per-site scrape memo so journaled sites aren't crawled again
+        with _lock:
+            for site, emails in sites.items():
+                if site not in _scraped_domains:
+                    cell = Future()
+                    cell.set_result(emails)
+                    _scraped_domains[site] = cell
+
+        new = not os.path.exists(path)
+        self.file = open(path, 'a', encoding='utf-8')
+        if new:
+            self.file.write(json.dumps({'scope': scope}) + '\n')
+            self.file.flush()
+
+    @staticmethod
+    def key(home):
+        return home.get('location_id') or home.get('name', '')
+
+    def record(self, home, result):
+        emails, source, note = result
+        entry = {'key': self.key(home), 'site': site_key(home.get('website', '')),
+                 'emails': emails, 'source': source, 'note': note}
+        with stats.timer('journal'):
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def build_email_list(cqc_data, max_targets=500, scrape_websites=True,
+                     workers=BUILD_WORKERS, output_file=None, journal_file=None,
+                     journal_scope=None, store=None, include_contacted=False):
+    """
+    Build email target list from CQC data.
+    Tries website scraping first, then falls back to pattern guessing.
+    Homes are scraped concurrently with a bounded number in flight and
+    results are taken in input order. Once max_targets is reached the
+    outstanding work is cancelled. With output_file, targets are written
+    as they are found. With journal_file, homes finished by an earlier
+    run with the same journal_scope are replayed from the journal instead
+    of being scraped again.
+    With a TargetStore, opted-out and previously contacted domains are
+    skipped before scraping and new targets are recorded in the store.
+    """
+    targets = []
+    writer = TargetWriter(output_file, store=store) if output_file else None
+    journal = BuildJournal(journal_file, journal_scope) if journal_file else None
+    if journal and journal.done:
+        print(f"Resuming: {len(journal.done)} homes already processed in {journal_file}")
+
+    count = f"{len(cqc_data)} " if hasattr(cqc_data, '__len__') else ''
+    print(f"\nBuilding email list from {count}care homes...")
+    print(f"Target: {max_targets} emails\n")
+
+    homes = (home for home in cqc_data if home.get('name', ''))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+
+    def fill():
+        while len(pending) < workers * 2:
+            home = next(homes, None)
+            if home is None:
+                return
+            # Opt-outs and contacted sites are checked first, for replayed homes too
+            if store and store.skip_domain(site_key(home.get('website', '')), include_contacted):
+                skipped = Future()
+                skipped.set_result(([], 'none', 'SUPPRESSED/CONTACTED'))
+                pending.append((home, skipped, False))
+            elif journal and journal.key(home) in journal.done:
+                replayed = Future()
+                replayed.set_result(journal.done[journal.key(home)])
+                pending.append((home, replayed, False))
+            else:
+                pending.append((home, executor.submit(find_emails, home, scrape_websites), True))
+
+    try:
+        fill()
+        position = 0
+        while pending and len(targets) < max_targets:
+            home, future, fresh = pending.popleft()
+            emails_found, source, note = future.result()
+            if journal and fresh:
+                journal.record(home, (emails_found, source, note))
+            if store:
+                emails_found = [e for e in emails_found if not store.is_suppressed(e)]
+            fill()
+
+            position += 1
+            stats.count('homes')
+            stats.count(f'homes_{source}')
+            name = home.get('name', '')
+            print(f"[{position}] {name[:50]}... {note}", end=' ' if note else '')
+
+            if emails_found:
+                for email in emails_found:
+                    target = {
+                        'care_home': name,
+                        'email': email,
+                        'website': home.get('website', ''),
+                        'rating': home.get('rating', ''),
+                        'town': home.get('town', ''),
+                        'phone': home.get('phone', ''),
+                        'source': source
+                    }
+                    targets.append(target)
+                    if writer:
+                        writer.write(target)
+                print("OK")
+            else:
+                print("SKIP")
+    finally:
+        # Reached max_targets (or interrupted) - drop homes not yet scraped
+        executor.shutdown(wait=False, cancel_futures=True)
+        if writer:
+            writer.close()
+        if journal:
+            journal.close()
 
     return targets
 
 
-def save_targets(targets, output_file='careowl_targets.csv'):
-    """Save targets to CSV for email campaign."""
+class TargetWriter:
+    """Streams unique targets (by email) to a campaign CSV as they are found."""
+
+    FIELDS = ['care_home', 'email', 'website', 'rating', 'town', 'phone', 'source']
+
+    def __init__(self, output_file='careowl_targets.csv', store=None):
+        self.output_file = output_file
+        self.store = store
+        self.file = open(output_file, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.FIELDS)
+        self.writer.writeheader()
+        self.seen = set()
+        self.by_source = {}
+
+    def write(self, target):
+        """Write a target unless its email was already written. Returns True if written."""
+        if target['email'] in self.seen:
+            return False
+        self.seen.add(target['email'])
+        with stats.timer('csv'):
+            self.writer.writerow(target)
+            self.file.flush()
+        stats.count('targets')
+        if self.store:
+            self.store.add_target(target)
+
+        src = target['source']
+        self.by_source[src] = self.by_source.get(src, 0) + 1
+        return True
+
+    def close(self):
+        self.file.close()
+        print(f"\nSaved {len(self.seen)} unique targets to {self.output_file}")
+
+        # Stats
+        print("\nBy source:")
+        for src, count in self.by_source.items():
+            print(f"  {src}: {count}")
+
+
+def save_targets(targets, output_file='careowl_targets.csv', store=None):
+    """Save targets to CSV for email campaign (and the target store, if given)."""
     if not targets:
         print("No targets to save!")
         return
 
     # Remove duplicates by email
-    seen = set()
-    unique = []
+    writer = TargetWriter(output_file, store=store)
     for t in targets:
-        if t['email'] not in seen:
-            seen.add(t['email'])
-            unique.append(t)
-
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['care_home', 'email', 'website', 'rating', 'town', 'phone', 'source'])
-        writer.writeheader()
-        writer.writerows(unique)
-
-    print(f"\nSaved {len(unique)} unique targets to {output_file}")
-
-    # Stats
-    by_source = {}
-    for t in unique:
-        src = t['source']
-        by_source[src] = by_source.get(src, 0) + 1
+        writer.write(t)
+    writer.close()
+
+
+def location_filter_args():
+    """Read --near/--radius/--region from the command line."""
+    near = radius = region = None
+    if '--near' in sys.argv:
+        near = sys.argv[sys.argv.index('--near') + 1]
+        radius = DEFAULT_RADIUS
+    if '--radius' in sys.argv:
+        radius = float(sys.argv[sys.argv.index('--radius') + 1])
+    if '--region' in sys.argv:
+        region = sys.argv[sys.argv.index('--region') + 1]
+    return near, radius, region
+
+
+def apply_location_filters(data):
+    """Narrow rows to the campaign's geography before any expensive stage."""
+    near, radius, region = location_filter_args()
+    if not near and not region:
+        return data
+
+    index = PostcodeIndex()
+    try:
+        data = list(filter_by_location(data, index, near=near, radius=radius, region=region))
+    finally:
+        index.close()
 
-    print("\nBy source:")
-    for src, count in by_source.items():
-        print(f"  {src}: {count}")
+    where = f"within {radius:g} miles of {near}" if near else ''
+    if region:
+        where = f"{where} in {region}".strip()
+    print(f"{len(data)} care homes {where}")
+    return data
 
 
 def main():
@@ -275,16 +849,33 @@ def main():
         max_pages = int(sys.argv[2]) if len(sys.argv) > 2 else None
         download_cqc_data(max_pages=max_pages)
 
+    elif command == 'sync':
+        data_file = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else 'cqc_care_homes.csv'
+        since = None
+
+        if '--since' in sys.argv:
+            idx = sys.argv.index('--since')
+            since = sys.argv[idx + 1]
+
+        if sync_cqc_data(data_file, since=since) is None:
+            sys.exit(1)
+
+    elif command == 'enrich':
+        data_file = sys.argv[2] if len(sys.argv) > 2 else 'cqc_care_homes.csv'
+        output_file = sys.argv[3] if len(sys.argv) > 3 else None
+        enrich_cqc_data(data_file, output_file)
+
     elif command == 'process':
         if len(sys.argv) < 3:
-            print("Usage: python cqc_email_builder.py process <cqc_data.csv>")
+            print("Usage: python cqc_email_builder.py process <cqc_data.csv> [rating] [--near POSTCODE --radius MILES] [--region NAME]")
             sys.exit(1)
 
         filepath = sys.argv[2]
-        rating = sys.argv[3] if len(sys.argv) > 3 else None
+        rating = sys.argv[3] if len(sys.argv) > 3 and not sys.argv[3].startswith('--') else None
 
         data = process_cqc_csv(filepath, rating_filter=rating)
         print(f"Processed {len(data)} entries")
+        data = apply_location_filters(data)
 
         # Show sample
         for entry in data[:5]:
@@ -292,25 +883,54 @@ def main():
 
     elif command == 'build-list':
         if len(sys.argv) < 3:
-            print("Usage: python cqc_email_builder.py build-list <cqc_data.csv> [--max N]")
+            print("Usage: python cqc_email_builder.py build-list <cqc_data.csv> [--max N] [--workers N] [--fresh]")
+            print("       [--campaign NAME] [--include-contacted] [--near POSTCODE --radius MILES] [--region NAME]")
             sys.exit(1)
 
         filepath = sys.argv[2]
         max_targets = 500
+        workers = BUILD_WORKERS
 
         if '--max' in sys.argv:
             idx = sys.argv.index('--max')
             max_targets = int(sys.argv[idx + 1])
 
-        # Process CSV
+        if '--workers' in sys.argv:
+            idx = sys.argv.index('--workers')
+            workers = int(sys.argv[idx + 1])
+
+        # Process CSV - only rows with a website can produce emails
         data = process_cqc_csv(filepath)
         print(f"Loaded {len(data)} care homes from CSV")
-
-        # Build email list
-        targets = build_email_list(data, max_targets=max_targets)
-
-        # Save
-        save_targets(targets)
+        fill_provider_websites(data)
+        data = apply_location_filters(data)
+        data = [home for home in data if home['website']]
+        print(f"{len(data)} have a website (run enrich to fill in missing ones)")
+
+        # Journal of finished homes - rerunning the same command resumes
+        journal_file = 'careowl_targets.journal'
+        if '--fresh' in sys.argv and os.path.exists(journal_file):
+            os.remove(journal_file)
+
+        # Opt-outs and earlier campaigns live in the target store
+        campaign = None
+        if '--campaign' in sys.argv:
+            idx = sys.argv.index('--campaign')
+            campaign = sys.argv[idx + 1]
+        store = TargetStore(campaign=campaign)
+        print(f"Campaign {store.campaign}: {len(store.suppressed)} suppressions, "
+              f"{len(store.contacted_domains)} domains contacted before")
+
+        # Build email list, saving targets as they are found. The journal only
+        # resumes a run of the same campaign over the same input file.
+        scope = {'campaign': store.campaign, 'input': file_digest(filepath)}
+        try:
+            build_email_list(data, max_targets=max_targets, workers=workers,
+                             output_file='careowl_targets.csv', journal_file=journal_file,
+                             journal_scope=scope, store=store,
+                             include_contacted='--include-contacted' in sys.argv)
+        finally:
+            store.close()
 
     elif command == 'quick-build':
         # Quick mode: download limited data and build list
@@ -328,4 +948,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    run_main(main, 'cqc_email_builder')
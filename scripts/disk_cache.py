@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Persistent key/value cache for the outreach scripts.
+Backed by a single SQLite file so entries survive between runs.
+
+Usage:
+    cache = DiskCache('ch_cache.db', max_entries=50000)
+    data = cache.get('company', '12345678', ttl=7 * 86400)
+    cache.set('company', '12345678', data)
+"""
+
+import json
+import time
+import sqlite3
+import threading
+
+
+class DiskCache:
+    """
+    JSON values keyed by (namespace, key), each with its own age check.
+    Least recently used entries are evicted once max_entries is exceeded.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path, max_entries=50000):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.writes = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT, key TEXT, value TEXT,
+                stored_at REAL, accessed_at REAL,
+                PRIMARY KEY (namespace, key)
+            )""")
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_accessed ON cache (accessed_at)')
+        self.conn.commit()
+
+    def get(self, namespace, key, ttl=None):
+        """Return the cached value, or None if missing or older than ttl seconds."""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT value, stored_at FROM cache WHERE namespace = ? AND key = ?',
+                (namespace, key)).fetchone()
+            if row is None:
+                return None
+            if ttl is not None and now - row[1] > ttl:
+                return None
+
+            self.conn.execute(
+                'UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?',
+                (now, namespace, key))
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value):
+        """Store a JSON-serialisable value."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+                (namespace, key, json.dumps(value), now, now))
+            self.conn.commit()
+
+            # Check the size bound every so often rather than on every write
+            self.writes += 1
+            if self.writes % 100 == 0:
+                self._evict()
+        return value
+
+    def delete(self, namespace, key):
+        """Drop a single entry."""
+        with self.lock:
+            self.conn.execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (namespace, key))
+            self.conn.commit()
+
+    def _evict(self):
+        """Remove least recently used entries beyond max_entries (lock held)."""
+        count = self.conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute("""
+                DELETE FROM cache WHERE rowid IN (
+                    SELECT rowid FROM cache ORDER BY accessed_at LIMIT ?
+                )""", (excess,))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self._evict()
+            self.conn.close()
@@ -6,20 +6,42 @@ Free methods for finding business emails
 Usage:
     python email_scraper.py scrape-website https://example-carehome.co.uk
     python email_scraper.py scrape-list websites.txt
+    python email_scraper.py scrape-list websites.txt --concurrency 50
     python email_scraper.py guess-emails "John Smith" example-carehome.co.uk
+    python email_scraper.py guess-emails "John Smith" example-carehome.co.uk --known j.bloggs@example-carehome.co.uk
+    python email_scraper.py guess-officers 12345678 example-carehome.co.uk --scrape
     python email_scraper.py verify email@example.com
+    python email_scraper.py verify-list careowl_targets.csv
 """
 
+import os
 import re
 import sys
 import csv
 import json
 import time
+import heapq
 import socket
+import zlib
+import asyncio
 import smtplib
+import itertools
+import threading
+import multiprocessing
 import requests
-from urllib.parse import urlparse, urljoin
+from html import unescape
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlparse, urljoin, urldefrag
+from urllib.robotparser import RobotFileParser
 from pathlib import Path
+from disk_cache import DiskCache
+from run_stats import stats, run_main
+
+try:
+    import dns.resolver  # Optional (pip install dnspython): MX lookups in verify-list
+except ImportError:
+    dns = None
 
 # Disable SSL warnings for scraping
 import urllib3
@@ -46,29 +68,508 @@ EMAIL_PATTERNS = [
     'office@{domain}',
 ]
 
+# robots.txt and sitemap results, kept between runs
+SITE_CACHE_FILE = os.environ.get('SCRAPE_CACHE', 'scrape_cache.db')
+SITE_INFO_TTL = 7 * 86400
+MAX_SITEMAPS = 3  # Sitemap files read per site (an index counts as one)
+SITEMAP_CANDIDATES = 10
+MAX_CRAWL_DELAY = 10
+HOST_DELAY = 1  # Seconds between sites on the same host in scrape-list
+
+# verify-list DNS lookups, cached in SITE_CACHE_FILE until the record's TTL runs out
+DNS_WORKERS = 32
+DNS_TIMEOUT = 5
+DNS_DEFAULT_TTL = 86400  # When the resolver doesn't say (no dnspython)
+DNS_NEGATIVE_TTL = 3600  # Domains that don't exist
+DNS_MAX_TTL = 7 * 86400
+
+# Page downloads are streamed and cut off at these limits
+MAX_PAGE_BYTES = 1024 * 1024
+MAX_SITEMAP_BYTES = 10 * 1024 * 1024
+PAGE_DEADLINE = 20  # Seconds per page, however slowly it trickles in
+CHUNK_SIZE = 64 * 1024
+PAGE_TYPES = {'text/html', 'application/xhtml+xml', 'text/plain'}
+
+# Pages fetched per site: the homepage plus the best few contact candidates
+MAX_PAGES_PER_SITE = 4
+
+# Words in a link's URL or text that suggest it leads to contact details
+CONTACT_KEYWORDS = [
+    ('contact', 10), ('get-in-touch', 9), ('get in touch', 9), ('enquir', 8),
+    ('email', 6), ('find-us', 5), ('find us', 5), ('about', 4), ('visit', 3),
+    ('team', 3), ('staff', 3), ('manager', 3), ('who-we-are', 3), ('who we are', 3),
+]
+UNLIKELY_KEYWORDS = ['blog', 'news', 'career', 'job', 'vacanc', 'recruit', 'privacy',
+                     'cookie', 'terms', 'login', 'gallery', 'event']
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.mp4',
+                   '.doc', '.docx', '.xls', '.xlsx', '.zip', '.css', '.js', '.xml')
+# Only tried when the homepage offers no likely links (JS menus, failed fetch)
+FALLBACK_PATHS = ['/contact', '/contact-us']
+
+ANCHOR_RE = re.compile(rb'<a\s(?:[^>]*?\s)?href\s*=\s*["\']?([^"\'\s>]+)[^>]*>(?:(.{0,300}?)</a>)?',
+                       re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(rb'<[^>]*>')
+LOC_RE = re.compile(rb'<loc>\s*(?:<!\[CDATA\[)?\s*([^<\s\]]+)', re.IGNORECASE)
+
+# Patterns for a named person; the rest of EMAIL_PATTERNS are role addresses
+PERSON_PATTERNS = [p for p in EMAIL_PATTERNS if '{f' in p or '{last}' in p]
+ROLE_LOCALS = {p.split('@')[0] for p in EMAIL_PATTERNS if p not in PERSON_PATTERNS} | {
+    'reception', 'hello', 'mail', 'care', 'home', 'accounts', 'hr', 'jobs', 'recruitment', 'sales',
+}
+
+# Local parts whose shape gives the pattern away without knowing the name
+PATTERN_SHAPES = {
+    '{f}.{last}@{domain}': re.compile(r'[a-z]\.[a-z]{2,}$'),
+    '{first}.{last}@{domain}': re.compile(r'[a-z]{2,}\.[a-z]{2,}$'),
+    '{first}_{last}@{domain}': re.compile(r'[a-z]{2,}_[a-z]{2,}$'),
+}
+_NAME_CHARS_RE = re.compile(r'[^a-z]')
+
+# Public suffixes under which a registrable domain has three labels
+MULTI_LABEL_SUFFIXES = {
+    'co.uk', 'org.uk', 'me.uk', 'ltd.uk', 'plc.uk', 'net.uk', 'sch.uk',
+    'ac.uk', 'gov.uk', 'nhs.uk', 'police.uk', 'mod.uk',
+    'com.au', 'net.au', 'org.au', 'co.nz', 'org.nz', 'co.za', 'co.ie',
+}
+
+# Site builders that give each customer their own subdomain (the private
+# section of the public suffix list): 'sunnyside.wixsite.com' is one home's site
+SHARED_HOST_SUFFIXES = {
+    'wixsite.com', 'blogspot.com', 'wordpress.com', 'weebly.com', 'business.site',
+    'godaddysites.com', 'jimdosite.com', 'webflow.io', 'github.io', 'square.site',
+}
+
+# Shared hosts where a site is a path, and how many path segments name it:
+# 'facebook.com/sunnyside', 'sites.google.com/view/sunnyside'
+SHARED_PATH_HOSTS = {
+    'facebook.com': 1, 'instagram.com': 1, 'twitter.com': 1, 'x.com': 1,
+    'linkedin.com': 2, 'sites.google.com': 2,
+}
+
+
+@lru_cache(maxsize=65536)
+def registrable_domain(url):
+    """
+    Reduce a URL or host to its registrable domain.
+    'https://www.sunnyside.co.uk/contact' and 'homes.sunnyside.co.uk'
+    both give 'sunnyside.co.uk'.
+    """
+    url = url.strip().lower()
+    if not url:
+        return ''
+    if '//' not in url:
+        url = '//' + url
+
+    host = (urlparse(url).hostname or '').rstrip('.')
+    if not host or host.replace('.', '').isdigit():
+        return host  # Empty or an IP address
+
+    labels = host.split('.')
+    suffix = '.'.join(labels[-2:])
+    keep = 3 if suffix in MULTI_LABEL_SUFFIXES or suffix in SHARED_HOST_SUFFIXES else 2
+    return '.'.join(labels[-keep:])
+
+
+def _shared_path_host(url):
+    """(host, path) when url is on a SHARED_PATH_HOSTS host, else (None, None)."""
+    url = url.strip().lower()
+    if '//' not in url:
+        url = '//' + url
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').rstrip('.')
+    for candidate in (host.removeprefix('www.'), registrable_domain(host)):
+        if candidate in SHARED_PATH_HOSTS:
+            return candidate, parsed.path
+    return None, None
+
+
+@lru_cache(maxsize=65536)
+def site_key(url):
+    """
+    What a website's emails belong to: its registrable domain, or the page
+    on a shared host, e.g. 'facebook.com/sunnysidecare' - so homes on the
+    same platform are scraped, remembered and skipped separately.
+    """
+    host, path = _shared_path_host(url)
+    if host is None:
+        return registrable_domain(url)
+    segments = [part for part in path.split('/') if part][:SHARED_PATH_HOSTS[host]]
+    return '/'.join([host] + segments)
+
+
+def on_shared_host(url):
+    """True if the site is on a platform's domain, so addresses can't be guessed from it."""
+    domain = registrable_domain(url)
+    return (_shared_path_host(url)[0] is not None
+            or '.'.join(domain.split('.')[-2:]) in SHARED_HOST_SUFFIXES)
+
+
+# One pattern for every form an address takes in a page, matched in a single pass:
+#   plain and mailto:          info@sunnyside.co.uk
+#   URL-encoded / entities     info%40sunnyside.co.uk, info&#64;sunnyside&#46;co&#46;uk
+#   obfuscated                 info [at] sunnyside [dot] co [dot] uk
+#   Cloudflare protection      data-cfemail="..." or /cdn-cgi/l/email-protection#...
+# The scan is anchored on the "@" (in any of its forms) rather than on the local
+# part, and every branch starts with a literal character, so the regex engine
+# skips ordinary text without entering the pattern. The local part is then
+# read back from just before the anchor. Only the spelled-out [at] forms may
+# have spaces around them - "Follow us @ sunnyside.co.uk" is prose, not an address.
+_DOT = r'(?:\.|&#0*46;|&#x0*2e;|&period;|\s?[\[\(\{]\s*dot\s*[\]\)\}]\s?)'
+_DOMAIN = r'((?:[a-zA-Z0-9-]+' + _DOT + r')+[a-zA-Z]{2,})'
+_CF_HEX = r'([0-9a-fA-F]{4,})'
+_EMAIL_SOURCE = '|'.join([
+    '-cfemail="' + _CF_HEX,          # Cloudflare: group 1
+    '/email-protection#' + _CF_HEX,  # Cloudflare: group 2
+    '@' + _DOMAIN,                   # Groups 3-5: the local part touches the "@"
+    '%40' + _DOMAIN,
+    '&(?:#0*64;|#x0*40;|commat;)' + _DOMAIN,
+    r'\[\s*at\s*\]\s?' + _DOMAIN,      # Groups 6-8: a space either side is allowed
+    r'\(\s*at\s*\)\s?' + _DOMAIN,
+    r'\{\s*at\s*\}\s?' + _DOMAIN,
+])
+_CF_GROUPS = 2
+_TIGHT_GROUPS = 5
+# Local parts longer than RFC 5321's 64 characters are not matched at all
+_LOCAL_SOURCE = r'(?<![a-zA-Z0-9._%+-])([a-zA-Z0-9._%+-]{1,64})\Z'
+_SPACED_LOCAL_SOURCE = r'(?<![a-zA-Z0-9._%+-])([a-zA-Z0-9._%+-]{1,64})\s?\Z'
+
+EMAIL_RE = re.compile(_EMAIL_SOURCE, re.IGNORECASE)
+EMAIL_RE_BYTES = re.compile(_EMAIL_SOURCE.encode(), re.IGNORECASE)
+LOCAL_RE = re.compile(_LOCAL_SOURCE)
+LOCAL_RE_BYTES = re.compile(_LOCAL_SOURCE.encode())
+SPACED_LOCAL_RE = re.compile(_SPACED_LOCAL_SOURCE)
+SPACED_LOCAL_RE_BYTES = re.compile(_SPACED_LOCAL_SOURCE.encode())
+_DOT_RE = re.compile(_DOT, re.IGNORECASE)
+
+# Things that look like addresses but aren't: image@2x.png, bundle@1.2.js
+_FALSE_POSITIVE_RE = re.compile(r'\.(?:png|jpe?g|gif|svg|webp|css|js)$|(?:^|\.)example\.(?:com|org)$')
+
+
+def _decode_cfemail(hex_string):
+    """Undo Cloudflare's XOR email protection."""
+    key = int(hex_string[:2], 16)
+    return ''.join(chr(int(hex_string[i:i + 2], 16) ^ key) for i in range(2, len(hex_string) - 1, 2))
+
+
+def extract_emails(data, start=0, end=None):
+    """
+    Extract email addresses from page content in one pass.
+    Accepts str or raw bytes (no need to decode the page first).
+    Only matches ending after offset start (and by end, if given) are kept.
+    Returns a set of lower-cased addresses.
+    """
+    is_bytes = isinstance(data, (bytes, bytearray, memoryview))
+    if is_bytes:
+        pattern, local_patterns = EMAIL_RE_BYTES, (LOCAL_RE_BYTES, SPACED_LOCAL_RE_BYTES)
+    else:
+        pattern, local_patterns = EMAIL_RE, (LOCAL_RE, SPACED_LOCAL_RE)
+
+    emails = set()
+    for match in pattern.finditer(data):
+        if end is not None and match.end() > end:
+            break
+        if match.end() <= start:
+            continue
+        value = match.group(match.lastindex)
+        if is_bytes:
+            value = value.decode('ascii')
+
+        if match.lastindex <= _CF_GROUPS:
+            email = _decode_cfemail(value).lower()
+            if '@' not in email:
+                continue
+            domain = email.split('@', 1)[1]
+        else:
+            anchor = match.start()
+            local_pattern = local_patterns[match.lastindex > _TIGHT_GROUPS]
+            local = local_pattern.search(data, max(0, anchor - 66), anchor)
+            if not local:
+                continue
+            local, domain = local.group(1), value
+            if is_bytes:
+                local = local.decode('ascii')
+
+            # Only obfuscated matches need their separators normalising
+            if not domain.replace('.', '').replace('-', '').isalnum():
+                domain = _DOT_RE.sub('.', domain)
+            domain = domain.lower()
+            email = f"{local.lstrip('.').lower()}@{domain}"
+
+        if not _FALSE_POSITIVE_RE.search(domain):
+            emails.add(email)
+    return emails
+
 
 def extract_emails_from_text(text):
     """Extract all email addresses from text using regex."""
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    emails = re.findall(email_pattern, text)
-    # Filter out common false positives
-    filtered = []
-    for email in emails:
-        email = email.lower()
-        # Skip image files, CSS, JS
-        if any(ext in email for ext in ['.png', '.jpg', '.gif', '.css', '.js']):
+    return list(extract_emails(text))
+
+
+def link_score(url, text=''):
+    """How likely a link is to lead to contact details (0 = not worth fetching)."""
+    path = urlparse(url).path.lower()
+    if path.endswith(SKIP_EXTENSIONS):
+        return 0
+
+    haystack = f"{path} {text.lower()}"
+    score = sum(weight for word, weight in CONTACT_KEYWORDS if word in haystack)
+    if not score:
+        return 0
+    if any(word in haystack for word in UNLIKELY_KEYWORDS):
+        score //= 3
+    # Shallow pages beat deep ones: /contact over /homes/leeds/news/contact-form
+    return max(score - path.rstrip('/').count('/') + 1, 1)
+
+
+def find_contact_links(page, page_url, site, start=0, end=None):
+    """
+    Score the same-site links on a page. Returns {url: score} for likely ones.
+    Only anchors ending after offset start (and by end, if given) are read.
+    """
+    links = {}
+    for match in ANCHOR_RE.finditer(page):
+        if end is not None and match.end() > end:
+            break
+        if match.end() <= start:
+            continue
+        href, text = match.groups(b'')
+        link = urldefrag(urljoin(page_url, unescape(href.decode('utf-8', 'ignore'))))[0]
+        if not link.startswith('http') or registrable_domain(link) != site:
             continue
-        # Skip example emails
-        if 'example.com' in email or 'example.org' in email:
+        score = link_score(link, TAG_RE.sub(b' ', text).decode('utf-8', 'ignore'))
+        if score > links.get(link, 0):
+            links[link] = score
+    return links
+
+
+_site_cache = None
+_site_info = {}  # (kind, site) -> cached result, for the life of the run
+_robots = {}
+_site_lock = threading.Lock()
+
+
+def get_site_cache():
+    """Open the robots/sitemap cache on first use."""
+    global _site_cache
+    with _site_lock:
+        if _site_cache is None:
+            _site_cache = DiskCache(SITE_CACHE_FILE)
+        return _site_cache
+
+
+def site_root(url):
+    """'https://www.example.co.uk/contact' -> 'https://www.example.co.uk'"""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def _site_cached(kind, root, fetch, *args):
+    """Per-site lookup cached in memory for the run and on disk between runs."""
+    key = (kind, root)
+    if key not in _site_info:
+        cache = get_site_cache()
+        value = cache.get(kind, root, ttl=SITE_INFO_TTL)
+        if value is None:
+            value = cache.set(kind, root, fetch(root, *args))
+        _site_info[key] = value
+    return _site_info[key]
+
+
+def _fetch_robots(root):
+    """robots.txt lines for a site ([] means nothing to honour)."""
+    try:
+        response = stats.get(requests.get, root + '/robots.txt', headers=HEADERS, timeout=10,
+                             verify=False, stream=True)
+    except Exception:
+        return []
+    with response:
+        if response.status_code in (401, 403):
+            return ['User-agent: *', 'Disallow: /']
+        # Some sites answer every path with their HTML homepage
+        if response.status_code != 200 or 'html' in response.headers.get('Content-Type', ''):
+            return []
+        body = b''.join(read_body(response, 500000))
+    return body.decode('utf-8', 'ignore').splitlines()
+
+
+def get_robots(url):
+    """Parsed robots.txt for the site a URL is on."""
+    root = site_root(url)
+    robots = _robots.get(root)
+    if robots is None:
+        robots = RobotFileParser(root + '/robots.txt')
+        robots.parse(_site_cached('robots', root, _fetch_robots))
+        robots.modified()  # An empty robots.txt allows everything
+        _robots[root] = robots
+    return robots
+
+
+def crawl_delay(robots):
+    """Seconds to wait between requests to a site."""
+    delay = robots.crawl_delay(HEADERS['User-Agent']) or 0
+    return min(max(float(delay), 0.5), MAX_CRAWL_DELAY)
+
+
+def _fetch_sitemap_links(root, sitemaps):
+    """Contact-like pages listed in a site's sitemaps, as [[url, score], ...] best first."""
+    queue = list(sitemaps or []) or [root + '/sitemap.xml']
+    site = registrable_domain(root)
+    links = {}
+
+    for _ in range(MAX_SITEMAPS):
+        if not queue:
+            break
+        try:
+            response = stats.get(requests.get, queue.pop(0), headers=HEADERS, timeout=10,
+                                 verify=False, stream=True)
+        except Exception:
+            continue
+        if response.status_code != 200:
+            response.close()
             continue
-        filtered.append(email)
-    return list(set(filtered))
+
+        body = b''.join(read_body(response, MAX_SITEMAP_BYTES))
+        if body[:2] == b'\x1f\x8b':  # sitemap.xml.gz - a cut-off download still decodes
+            try:
+                body = zlib.decompressobj(wbits=31).decompress(body, MAX_SITEMAP_BYTES)
+            except zlib.error:
+                continue
+
+        is_index = b'<sitemapindex' in body[:2000]
+        for loc in LOC_RE.findall(body):
+            loc = unescape(loc.decode('utf-8', 'ignore'))
+            if registrable_domain(loc) != site:
+                continue
+            if is_index:
+                # Page sitemaps hold the contact page; post/product ones rarely do
+                if 'page' in loc.lower():
+                    queue.insert(0, loc)
+                else:
+                    queue.append(loc)
+            else:
+                score = link_score(loc)
+                if score > links.get(loc, 0):
+                    links[loc] = score
+
+    best = sorted(links.items(), key=lambda item: -item[1])[:SITEMAP_CANDIDATES]
+    return [list(item) for item in best]
+
+
+def get_sitemap_links(url):
+    """Contact-like pages from the sitemaps robots.txt lists (or /sitemap.xml)."""
+    root = site_root(url)
+    return _site_cached('sitemap', root, _fetch_sitemap_links, get_robots(url).site_maps())
+
+
+def read_body(response, max_bytes=MAX_PAGE_BYTES):
+    """
+    Yield a streamed response's body in chunks, stopping at max_bytes or
+    PAGE_DEADLINE seconds (whichever comes first) and dropping the connection.
+    """
+    deadline = time.monotonic() + PAGE_DEADLINE
+    read = 0
+    raw = response.raw
+    if hasattr(raw, 'read1'):
+        # read1 returns whatever has arrived, so a trickling page can't outlast the deadline
+        chunks = iter(lambda: raw.read1(CHUNK_SIZE, decode_content=True), b'')
+    else:
+        chunks = response.iter_content(CHUNK_SIZE)  # urllib3 < 2.1
+    try:
+        for chunk in chunks:
+            yield chunk[:max_bytes - read]
+            read += len(chunk)
+            stats.add_bytes(response.url, len(chunk))
+            if read >= max_bytes or time.monotonic() > deadline:
+                break
+    except Exception as e:
+        pass  # Keep what arrived before a mid-body timeout or reset
+    finally:
+        response.close()
+
+
+def open_page(url):
+    """Start a streamed GET. Returns the response if it's a 200 HTML page, else None."""
+    try:
+        response = stats.get(requests.get, url, headers=HEADERS, timeout=10, verify=False, stream=True)
+    except Exception as e:
+        return None  # Silently skip failed pages
+
+    # PDFs, images and downloads are skipped on the headers alone
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if response.status_code != 200 or (content_type and content_type not in PAGE_TYPES):
+        response.close()
+        return None
+    return response
+
+
+def fetch_page(url):
+    """GET a page, capped at MAX_PAGE_BYTES. Returns (final_url, content) or None."""
+    response = open_page(url)
+    if response is None:
+        return None
+    return response.url, b''.join(read_body(response))
 
 
-def scrape_website_for_emails(url, follow_links=True):
+class PageScanner:
     """
-    Scrape a website for email addresses.
-    Checks main page, contact page, about page.
+    extract_emails and find_contact_links over a page fed in chunks, so the
+    page is never held whole. Matches near the end of a chunk are left for
+    the next feed, which sees them again with the carried-over tail; matches
+    already read from the tail are skipped.
+    """
+
+    OVERLAP = 2048  # Bytes carried between chunks
+    MARGIN = 512  # Matches ending this close to a chunk's end wait for more data
+
+    def __init__(self, page_url, site=None):
+        self.page_url = page_url
+        self.site = site or registrable_domain(page_url)
+        self.emails = set()
+        self.links = {}
+        self.tail = b''
+        self.done = 0  # Offset in tail up to which matches have been read
+
+    def feed(self, chunk, final=False):
+        data = self.tail + chunk
+        end = None if final else max(len(data) - self.MARGIN, self.done)
+        with stats.timer('extract'):
+            self.emails.update(extract_emails(data, self.done, end))
+            for link, score in find_contact_links(data, self.page_url, self.site, self.done, end).items():
+                if score > self.links.get(link, 0):
+                    self.links[link] = score
+        self.tail = data[-self.OVERLAP:]
+        self.done = max(end - (len(data) - len(self.tail)), 0) if end is not None else len(self.tail)
+
+    def close(self):
+        self.feed(b'', final=True)
+        return self.emails, self.links
+
+
+def scan_page(url, site=None):
+    """Stream a page through a PageScanner. Returns (final_url, emails, links) or None."""
+    response = open_page(url)
+    if response is None:
+        return None
+    scanner = PageScanner(response.url, site)
+    for chunk in read_body(response):
+        scanner.feed(chunk)
+    stats.count('pages')
+    return (response.url, *scanner.close())
+
+
+def analyse_page(content, page_url, site=None):
+    """Emails on a page plus its likely contact links (site defaults to the page's own)."""
+    site = site or registrable_domain(page_url)
+    # Scans the raw bytes once - mailto: links included
+    return extract_emails(content), find_contact_links(content, page_url, site)
+
+
+def crawl_site(url, follow_links=True, max_pages=MAX_PAGES_PER_SITE):
+    """
+    The crawl for one site, as a generator so the serial and async scrapers
+    share it. Yields (page_url, site, delay) for each page to fetch; send back
+    (final_url, emails, links) from analyse_page, or None if the fetch failed.
+    Returns the emails found.
     """
     emails = set()
     visited = set()
@@ -76,85 +577,246 @@ def scrape_website_for_emails(url, follow_links=True):
     # Normalize URL
     if not url.startswith('http'):
         url = 'https://' + url
+    site = registrable_domain(url)
+    home = url
 
-    parsed = urlparse(url)
-    base_domain = f"{parsed.scheme}://{parsed.netloc}"
-
-    # Pages to check
-    pages_to_check = [
-        url,
-        urljoin(base_domain, '/contact'),
-        urljoin(base_domain, '/contact-us'),
-        urljoin(base_domain, '/about'),
-        urljoin(base_domain, '/about-us'),
-        urljoin(base_domain, '/team'),
-        urljoin(base_domain, '/staff'),
-    ]
-
-    for page_url in pages_to_check:
+    # Crawl frontier: heap of (-score, discovery order, url), homepage first
+    order = itertools.count()
+    frontier = [(0, next(order), url)]
+    fetched = 0
+
+    while frontier and fetched < max_pages:
+        _, _, page_url = heapq.heappop(frontier)
         if page_url in visited:
             continue
         visited.add(page_url)
 
-        try:
-            response = requests.get(page_url, headers=HEADERS, timeout=10, verify=False)
-            if response.status_code == 200:
-                found = extract_emails_from_text(response.text)
-                emails.update(found)
+        robots = get_robots(page_url)
+        if not robots.can_fetch(HEADERS['User-Agent'], page_url):
+            continue
+        fetched += 1
 
-                # Also check for mailto: links
-                mailto_pattern = r'mailto:([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'
-                mailto_emails = re.findall(mailto_pattern, response.text)
-                emails.update([e.lower() for e in mailto_emails])
+        # The homepage's site isn't known until any redirect has been followed
+        if fetched == 1:
+            result = yield page_url, None, 0
+        else:
+            result = yield page_url, site, crawl_delay(robots)
+
+        links = {}
+        if result:
+            final_url, found, links = result
+            visited.add(final_url)
+            if fetched == 1:
+                # Follow the site if the homepage redirects to another domain
+                home = final_url
+                site = registrable_domain(home) or site
+            emails.update(found)
+
+        if emails or not follow_links:
+            break
+
+        if fetched == 1 and result:
+            # The sitemap often names the contact page outright
+            for link, score in get_sitemap_links(home):
+                links[link] = max(score, links.get(link, 0))
+
+        for link, score in links.items():
+            if link not in visited:
+                heapq.heappush(frontier, (-score, next(order), link))
+        if fetched == 1 and not frontier:
+            for path in FALLBACK_PATHS:
+                heapq.heappush(frontier, (0, next(order), urljoin(home, path)))
 
-        except Exception as e:
-            pass  # Silently skip failed pages
+    return list(emails)
 
-        time.sleep(0.5)  # Be nice to servers
 
-    return list(emails)
+def scrape_website_for_emails(url, follow_links=True, max_pages=MAX_PAGES_PER_SITE):
+    """
+    Scrape a website for email addresses.
+    Fetches the homepage, then follows the links (and sitemap entries) most
+    likely to lead to contact details, best first, and stops as soon as
+    emails turn up. Pages robots.txt disallows are skipped.
+    """
+    crawl = crawl_site(url, follow_links, max_pages)
+    result = None
+    try:
+        while True:
+            page_url, site, delay = crawl.send(result)
+            stats.sleep(delay)  # Be nice to servers
+            result = scan_page(page_url, site)
+    except StopIteration as done:
+        stats.count('sites')
+        return done.value
 
 
-def guess_email_patterns(full_name, domain):
+def _step(crawl, result):
+    """Advance a crawl by one page: (done, value). Runs in a thread - robots/sitemap lookups block."""
+    try:
+        return False, crawl.send(result)
+    except StopIteration as done:
+        return True, done.value
+
+
+async def _scrape_site_async(url, hosts, extract_pool):
+    """Async driver for crawl_site: fetches in threads, extracts in extract_pool."""
+    loop = asyncio.get_running_loop()
+    host = registrable_domain(url if url.startswith('http') else 'https://' + url)
+    lock = hosts.setdefault(host, [asyncio.Lock(), 0])[0]
+
+    # One site per host at a time, so each host sees one request at a time
+    async with lock:
+        wait = hosts[host][1] + HOST_DELAY - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+            stats.add_time('sleep', wait)
+
+        crawl = crawl_site(url)
+        done, value = await loop.run_in_executor(None, _step, crawl, None)
+        while not done:
+            page_url, site, delay = value
+            if delay:
+                await asyncio.sleep(delay)
+                stats.add_time('sleep', delay)
+            page = await loop.run_in_executor(None, fetch_page, page_url)
+            result = None
+            if page:
+                stats.count('pages')
+                # Timed from here, so this includes waiting for a free pool process
+                start = time.perf_counter()
+                found, links = await loop.run_in_executor(extract_pool, analyse_page, page[1], page[0], site)
+                stats.add_time('extract', time.perf_counter() - start)
+                result = (page[0], found, links)
+            done, value = await loop.run_in_executor(None, _step, crawl, result)
+
+        hosts[host][1] = loop.time()
+    stats.count('sites')
+    return value
+
+
+async def scrape_list_async(websites, writer, output, concurrency=20):
     """
-    Generate possible email addresses based on name and domain.
+    Scrape many sites at once: up to concurrency sites in flight, one per
+    host, with rows written (and flushed) as each site finishes.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    sites = iter(enumerate(websites, 1))
+    hosts = {}  # registrable domain -> [lock, time of last finished crawl]
+    total = 0
+
+    # Spawned rather than forked: the event loop already has threads running
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn')) as extract_pool:
+        async def worker():
+            nonlocal total
+            # The workers share one iterator, so each site is taken exactly once
+            for i, url in sites:
+                try:
+                    emails = await _scrape_site_async(url, hosts, extract_pool)
+                except Exception as e:
+                    print(f"  Error on {url}: {e}")
+                    emails = []
+                with stats.timer('csv'):
+                    for email in emails:
+                        writer.writerow({'website': url, 'email': email})
+                    output.flush()
+                total += len(emails)
+                stats.count('emails_found', len(emails))
+                print(f"[{i}/{len(websites)}] {url}: {len(emails)} email(s)")
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total
+
+
+def parse_person_name(full_name):
     """
-    # Clean the name
-    parts = full_name.strip().lower().split()
-    if len(parts) < 2:
-        # Just first name
-        first = parts[0] if parts else 'info'
-        last = ''
-        f = first[0] if first else ''
+    (first, last) in lower case, letters only, from 'John Smith' or a
+    Companies House officer name 'SMITH, John Andrew'.
+    """
+    if ',' in full_name:
+        surname, _, forenames = full_name.partition(',')
+        forenames = forenames.replace(',', ' ').split()
+        first = forenames[0] if forenames else ''
+        last = surname  # 'VAN DER BERG' -> 'vanderberg'
     else:
-        first = parts[0]
-        last = parts[-1]  # Use last part as surname
-        f = first[0]
+        parts = full_name.split()
+        first = parts[0] if parts else ''
+        last = parts[-1] if len(parts) > 1 else ''
+    return _NAME_CHARS_RE.sub('', first.lower()), _NAME_CHARS_RE.sub('', last.lower())
+
+
+def infer_email_patterns(known_emails, names=()):
+    """
+    Work out a domain's address convention from addresses already found on it.
+    Each personal address is matched against the known names (first, last)
+    where one fits, else by its shape ('j.smith' can only be {f}.{last}).
+    Returns the matching PERSON_PATTERNS, most used first ([] if none fit).
+    """
+    counts = {}
+    for email in known_emails:
+        local = email.lower().split('@', 1)[0]
+        if local in ROLE_LOCALS:
+            continue
+
+        matched = set()
+        for first, last in names:
+            if not first or not last:
+                continue
+            values = {'first': first, 'last': last, 'f': first[0], 'domain': ''}
+            matched.update(p for p in PERSON_PATTERNS if p.format(**values)[:-1] == local)
+        if not matched:
+            matched = {p for p, shape in PATTERN_SHAPES.items() if shape.match(local)}
+
+        for pattern in matched:
+            counts[pattern] = counts.get(pattern, 0) + 1
+
+    return sorted(counts, key=lambda p: (-counts[p], PERSON_PATTERNS.index(p)))
+
+
+def guess_email_patterns(full_name, domain, known_emails=None):
+    """
+    Generate possible email addresses based on name and domain.
+    If known_emails reveal the domain's convention, only that is used.
+    """
+    return guess_people_emails([full_name], domain, known_emails)[full_name]
 
-    # Clean domain
-    domain = domain.lower().strip()
-    if domain.startswith('http'):
-        domain = urlparse(domain).netloc
-    if domain.startswith('www.'):
-        domain = domain[4:]
-
-    guesses = []
-    for pattern in EMAIL_PATTERNS:
-        try:
-            email = pattern.format(
-                first=first,
-                last=last,
-                f=f,
-                domain=domain
-            )
-            if email and '@' in email and not email.startswith('@'):
-                guesses.append(email)
-        except:
-            pass
 
+def guess_people_emails(names, domain, known_emails=None):
+    """
+    Candidate addresses for a batch of people at one domain: {name: [emails]}.
+    The domain's convention is inferred once from known_emails (on that
+    domain); without one every pattern in EMAIL_PATTERNS is used. People
+    the convention can't be applied to (no surname) get the patterns
+    that don't need one instead.
+    """
+    # Clean domain
+    domain = registrable_domain(domain)
+    people = {name: parse_person_name(name) for name in names}
+
+    known = [e for e in known_emails or [] if registrable_domain(e.rsplit('@', 1)[-1]) == domain]
+    patterns = infer_email_patterns(known, people.values())[:1] or EMAIL_PATTERNS
+    first_name_patterns = [p for p in EMAIL_PATTERNS if '{last}' not in p]
+
+    guesses = {}
+    for name, (first, last) in people.items():
+        first = first or 'info'
+        values = {'first': first, 'last': last, 'f': first[0], 'domain': domain}
+        # Patterns that need a surname are no use without one
+        usable = [p for p in patterns if last or '{last}' not in p] or first_name_patterns
+        guesses[name] = [p.format(**values) for p in usable]
     return guesses
 
 
+def guess_officer_emails(officers, domain, known_emails=None):
+    """
+    guess_people_emails for the current directors in a
+    companies_house.get_officers() result.
+    """
+    names = [officer.get('name', '') for officer in (officers or {}).get('items', [])
+             if 'director' in officer.get('officer_role', '').lower()
+             and not officer.get('resigned_on') and ',' in officer.get('name', '')]
+    return guess_people_emails(names, domain, known_emails)
+
+
 def verify_email_smtp(email, timeout=10):
     """
     Verify if an email address exists using SMTP.
@@ -188,12 +850,114 @@ def verify_email_simple(email):
     """
     try:
         domain = email.split('@')[1]
-        socket.gethostbyname(domain)
-        return True
+        return check_domain(domain)['status'] in ('mx', 'a_only', 'resolves')
     except:
         return False
 
 
+def _lookup_domain(domain):
+    """
+    Resolve a mail domain. Returns {'status', 'mx', 'ttl'} where status is
+    'mx', 'a_only' (no MX, mail falls back to the A record), 'resolves'
+    (A record found, MX not checked), 'no_domain' or 'unknown' (lookup failed).
+    """
+    result = {'status': 'unknown', 'mx': '', 'ttl': 0}
+
+    if dns is not None:
+        try:
+            answer = dns.resolver.resolve(domain, 'MX', lifetime=DNS_TIMEOUT)
+            best = min(answer, key=lambda record: record.preference)
+            result.update(status='mx', mx=str(best.exchange).rstrip('.'), ttl=answer.rrset.ttl)
+            return result
+        except dns.resolver.NXDOMAIN:
+            result.update(status='no_domain', ttl=DNS_NEGATIVE_TTL)
+            return result
+        except (dns.resolver.NoAnswer, dns.resolver.NoNameservers):
+            pass  # No MX - see if the domain has an A record
+        except Exception:
+            return result  # Timeout: don't cache
+
+    try:
+        socket.getaddrinfo(domain, 25, proto=socket.IPPROTO_TCP)
+        result.update(status='a_only' if dns is not None else 'resolves', ttl=DNS_DEFAULT_TTL)
+    except socket.gaierror as e:
+        if e.errno in (socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)):
+            result.update(status='no_domain', ttl=DNS_NEGATIVE_TTL)
+    return result
+
+
+_dns_results = {}
+
+
+def check_domain(domain):
+    """DNS status of a mail domain, from memory, the disk cache or a fresh lookup."""
+    domain = domain.strip().lower().rstrip('.')
+    result = _dns_results.get(domain)
+    if result is not None:
+        return result
+    stats.count('dns_checks')
+
+    cache = get_site_cache()
+    result = cache.get('dns', domain)
+    if result is None or result['expires'] < time.time():
+        stats.count('dns_lookups')
+        result = _lookup_domain(domain)
+        result['expires'] = time.time() + min(result.pop('ttl'), DNS_MAX_TTL)
+        if result['status'] != 'unknown':
+            cache.set('dns', domain, result)
+
+    _dns_results[domain] = result
+    return result
+
+
+def check_domains(domains, workers=DNS_WORKERS):
+    """check_domain for many domains at once. Returns {domain: result}."""
+    domains = list(domains)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(domains, executor.map(check_domain, domains)))
+
+
+def verify_list(input_file, output_file=None, workers=DNS_WORKERS):
+    """
+    Add domain_status and mx_host columns to a target CSV (with an email column).
+    Each distinct domain is resolved once, however many addresses share it.
+    """
+    if output_file is None:
+        path = Path(input_file)
+        output_file = str(path.with_name(f"{path.stem}_verified.csv"))
+
+    with open(input_file, 'r', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames
+        domains = {row['email'].rsplit('@', 1)[1].strip().lower()
+                   for row in reader if '@' in (row.get('email') or '')}
+
+    start = time.time()
+    print(f"Resolving {len(domains)} domains ({workers} at a time)...")
+    with stats.timer('dns'):
+        results = check_domains(sorted(domains), workers)
+    stats.count('domains', len(domains))
+    print(f"  Done in {time.time() - start:.1f}s")
+
+    counts = {}
+    with stats.timer('csv'), open(input_file, 'r', encoding='utf-8-sig') as f, \
+            open(output_file, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.DictWriter(out, fieldnames=fields + ['domain_status', 'mx_host'])
+        writer.writeheader()
+        for row in csv.DictReader(f):
+            email = row.get('email') or ''
+            result = results.get(email.rsplit('@', 1)[-1].strip().lower()) if '@' in email else None
+            status = result['status'] if result else 'invalid'
+            row.update(domain_status=status, mx_host=result['mx'] if result else '')
+            writer.writerow(row)
+            counts[status] = counts.get(status, 0) + 1
+
+    for status, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"  {status}: {count}")
+    print(f"Saved to {output_file}")
+    return counts
+
+
 def process_cqc_csv(filepath):
     """
     Process CQC data CSV and extract domains for email scraping.
@@ -228,7 +992,7 @@ def scrape_google_for_email(company_name, location='UK'):
     search_url = f'https://www.google.com/search?q={requests.utils.quote(query)}'
 
     try:
-        response = requests.get(search_url, headers=HEADERS, timeout=10)
+        response = stats.get(requests.get, search_url, headers=HEADERS, timeout=10)
         if response.status_code == 200:
             emails = extract_emails_from_text(response.text)
             return emails
@@ -238,6 +1002,17 @@ def scrape_google_for_email(company_name, location='UK'):
     return []
 
 
+def known_emails_arg():
+    """Addresses passed as --known a@x.com,b@x.com (a file of one per line also works)."""
+    if '--known' not in sys.argv:
+        return []
+    value = sys.argv[sys.argv.index('--known') + 1]
+    if Path(value).is_file():
+        with open(value, 'r') as f:
+            return [line.strip() for line in f if '@' in line]
+    return [e.strip() for e in value.split(',') if '@' in e]
+
+
 def main():
     if len(sys.argv) < 2:
         print(__doc__)
@@ -263,46 +1038,90 @@ def main():
 
     elif command == 'scrape-list':
         if len(sys.argv) < 3:
-            print("Usage: python email_scraper.py scrape-list <file.txt>")
+            print("Usage: python email_scraper.py scrape-list <file.txt> [--concurrency N]")
             sys.exit(1)
 
         filepath = sys.argv[2]
         output_file = 'scraped_emails.csv'
 
+        concurrency = None
+        if '--concurrency' in sys.argv:
+            idx = sys.argv.index('--concurrency')
+            concurrency = int(sys.argv[idx + 1])
+
         with open(filepath, 'r') as f:
             websites = [line.strip() for line in f if line.strip()]
 
         print(f"Scraping {len(websites)} websites...")
 
-        results = []
-        for i, url in enumerate(websites, 1):
-            print(f"[{i}/{len(websites)}] {url}")
-            emails = scrape_website_for_emails(url)
-            for email in emails:
-                results.append({'website': url, 'email': email})
-            time.sleep(1)  # Rate limiting
-
-        # Save results
+        # Rows are written as each site finishes, so an interrupted run keeps its results
         with open(output_file, 'w', newline='') as f:
             writer = csv.DictWriter(f, fieldnames=['website', 'email'])
             writer.writeheader()
-            writer.writerows(results)
 
-        print(f"\nSaved {len(results)} emails to {output_file}")
+            if concurrency:
+                total = asyncio.run(scrape_list_async(websites, writer, f, concurrency))
+            else:
+                total = 0
+                for i, url in enumerate(websites, 1):
+                    print(f"[{i}/{len(websites)}] {url}")
+                    emails = scrape_website_for_emails(url)
+                    with stats.timer('csv'):
+                        for email in emails:
+                            writer.writerow({'website': url, 'email': email})
+                        f.flush()
+                    total += len(emails)
+                    stats.count('emails_found', len(emails))
+                    stats.sleep(1)  # Rate limiting
+
+        print(f"\nSaved {total} emails to {output_file}")
 
     elif command == 'guess-emails':
         if len(sys.argv) < 4:
-            print("Usage: python email_scraper.py guess-emails \"Full Name\" domain.com")
+            print("Usage: python email_scraper.py guess-emails \"Full Name\" domain.com [--known a@domain.com,b@domain.com]")
             sys.exit(1)
 
         name = sys.argv[2]
         domain = sys.argv[3]
+        known = known_emails_arg()
 
         print(f"Generating email patterns for {name} at {domain}:\n")
-        guesses = guess_email_patterns(name, domain)
+        guesses = guess_email_patterns(name, domain, known)
         for email in guesses:
             print(f"  {email}")
 
+    elif command == 'guess-officers':
+        if len(sys.argv) < 4:
+            print("Usage: python email_scraper.py guess-officers <company_number> domain.com [--known a@domain.com,...] [--scrape]")
+            sys.exit(1)
+
+        from companies_house import get_officers
+
+        company_number = sys.argv[2]
+        domain = sys.argv[3]
+        known = known_emails_arg()
+        if '--scrape' in sys.argv:
+            print(f"Scraping {domain} for known addresses...")
+            known += scrape_website_for_emails(domain)
+
+        guesses = guess_officer_emails(get_officers(company_number), domain, known)
+        if not guesses:
+            print("No current directors found")
+            sys.exit(1)
+
+        patterns = infer_email_patterns(
+            [e for e in known if registrable_domain(e.rsplit('@', 1)[-1]) == registrable_domain(domain)],
+            [parse_person_name(name) for name in guesses])
+        if patterns:
+            print(f"Convention at {registrable_domain(domain)}: {patterns[0].split('@')[0]}\n")
+        else:
+            print(f"No convention found at {registrable_domain(domain)} - using every pattern\n")
+
+        for name, emails in guesses.items():
+            print(f"  {name}:")
+            for email in emails:
+                print(f"    {email}")
+
     elif command == 'verify':
         if len(sys.argv) < 3:
             print("Usage: python email_scraper.py verify <email>")
@@ -328,6 +1147,24 @@ def main():
         else:
             print(f"  SMTP verification: UNABLE TO VERIFY (server blocked)")
 
+    elif command == 'verify-list':
+        if len(sys.argv) < 3:
+            print("Usage: python email_scraper.py verify-list <targets.csv> [--output FILE] [--workers N]")
+            sys.exit(1)
+
+        output_file = None
+        workers = DNS_WORKERS
+        if '--output' in sys.argv:
+            idx = sys.argv.index('--output')
+            output_file = sys.argv[idx + 1]
+        if '--workers' in sys.argv:
+            idx = sys.argv.index('--workers')
+            workers = int(sys.argv[idx + 1])
+
+        if dns is None:
+            print("dnspython not installed - checking A records only (pip install dnspython for MX)")
+        verify_list(sys.argv[2], output_file, workers)
+
     elif command == 'process-cqc':
         if len(sys.argv) < 3:
             print("Usage: python email_scraper.py process-cqc <cqc_data.csv>")
@@ -359,4 +1196,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    run_main(main, 'email_scraper')
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Outreach Pipeline for Go Owl Digital
+Runs the campaign steps in order, skipping any whose output is still up to date
+
+Usage:
+    python pipeline.py run                              # CareOwl: download -> enrich -> build-list
+    python pipeline.py run build-list --max 200         # Only build-list reruns (and resumes its journal)
+    python pipeline.py run scrape-list --concurrency 50
+    python pipeline.py run search-sic --sic 49410 --limit 200
+    python pipeline.py run enrich --force               # Rerun a stage even if it is up to date
+    python pipeline.py status
+
+A stage reruns when the contents of its inputs, its parameters or its
+outputs have changed since it last ran, or its outputs are older than
+the stage allows. State is kept in pipeline_state.json.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import subprocess
+from pathlib import Path
+from email_scraper import site_key
+from cqc_email_builder import process_cqc_csv
+from target_store import current_campaign
+from run_stats import stats, run_main
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+STATE_FILE = 'pipeline_state.json'
+
+DEFAULT_TARGETS = ['build-list']
+
+CQC_DATA = 'cqc_care_homes.csv'
+CQC_ENRICHED = 'cqc_enriched.csv'
+CQC_WEBSITES = 'cqc_websites.txt'
+
+
+def download_complete(params):
+    """A download with failed pages exits cleanly but must not be cached."""
+    manifest = Path(CQC_DATA).with_suffix('').as_posix() + '_pages/manifest.json'
+    if not os.path.exists(manifest):
+        return False
+    with open(manifest) as f:
+        return bool(json.load(f).get('complete')) or bool(params.get('--pages'))
+
+
+def write_websites(params):
+    """One website per site (registrable domain, or page on a shared host), for scrape-list."""
+    seen = set()
+    with open(CQC_WEBSITES + '.tmp', 'w') as f:
+        for home in process_cqc_csv(CQC_ENRICHED):
+            key = site_key(home['website'])
+            if key and key not in seen:
+                seen.add(key)
+                f.write(home['website'].strip() + '\n')
+    os.replace(CQC_WEBSITES + '.tmp', CQC_WEBSITES)
+    print(f"Saved {len(seen)} websites to {CQC_WEBSITES}")
+    return 0
+
+
+# Each stage: the command it runs (a script argv, or a function), the files it
+# reads and writes, the options that change its output (with defaults) and
+# options that only change how it runs. Values may depend on the options.
+STAGES = {
+    'download': {
+        'command': lambda p: ['cqc_email_builder.py', 'download'] + ([p['--pages']] if p['--pages'] else []),
+        'inputs': [],
+        'outputs': [CQC_DATA],
+        'params': {'--pages': None},
+        'max_age': 7 * 86400,
+        # Once the data is old, a sync (changed locations only) brings it up to date.
+        # A --pages sample can't be synced, so it is downloaded again instead.
+        'refresh': lambda p: None if p['--pages'] else ['cqc_email_builder.py', 'sync', CQC_DATA],
+        'complete': download_complete,
+    },
+    'enrich': {
+        'command': lambda p: ['cqc_email_builder.py', 'enrich', CQC_DATA, CQC_ENRICHED],
+        'inputs': [CQC_DATA],
+        'outputs': [CQC_ENRICHED],
+    },
+    'websites': {
+        'function': write_websites,
+        'inputs': [CQC_ENRICHED],
+        'outputs': [CQC_WEBSITES],
+    },
+    'build-list': {
+        'command': lambda p: ['cqc_email_builder.py', 'build-list', CQC_ENRICHED],
+        'inputs': [CQC_ENRICHED],
+        'outputs': ['careowl_targets.csv'],
+        # The campaign decides which domains count as already contacted
+        'params': {'--max': '500', '--campaign': current_campaign(), '--near': None,
+                   '--radius': None, '--region': None, '--include-contacted': False},
+        'tuning': {'--workers': None},
+    },
+    'scrape-list': {
+        'command': lambda p: ['email_scraper.py', 'scrape-list', CQC_WEBSITES],
+        'inputs': [CQC_WEBSITES],
+        'outputs': ['scraped_emails.csv'],
+        'tuning': {'--concurrency': None},
+    },
+    'search-sic': {
+        'command': lambda p: ['companies_house.py', 'search-sic', p['--sic']],
+        'inputs': [],
+        'outputs': lambda p: [f"sic_{p['--sic']}_targets.csv"],
+        'params': {'--sic': None, '--limit': None, '--area': None, '--location': None,
+                   '--campaign': current_campaign()},
+        'required': ['--sic'],
+        'max_age': 7 * 86400,
+    },
+}
+
+
+def _resolve(value, params):
+    return value(params) if callable(value) else value
+
+
+def state_key(name, stage, params):
+    """Stages run per value of a required option (search-sic per code) keep separate state."""
+    return ' '.join([name] + [str(params[k]) for k in stage.get('required', [])])
+
+
+def parse_options(argv):
+    """'--max 200 --force' -> {'--max': '200', '--force': True}"""
+    options = {}
+    for i, arg in enumerate(argv):
+        if arg.startswith('--'):
+            value = argv[i + 1] if i + 1 < len(argv) and not argv[i + 1].startswith('--') else True
+            options[arg] = value
+    return options
+
+
+def stage_params(stage, options):
+    """(params that change the output, tuning options) for a stage."""
+    params = {k: options.get(k, default) for k, default in stage.get('params', {}).items()}
+    tuning = {k: options.get(k, default) for k, default in stage.get('tuning', {}).items()}
+    return params, tuning
+
+
+def option_args(values):
+    args = []
+    for key, value in values.items():
+        if value is True:
+            args.append(key)
+        elif value not in (None, False):
+            args += [key, str(value)]
+    return args
+
+
+def script_argv(argv):
+    """['cqc_email_builder.py', ...] -> a command line run with this Python."""
+    return [sys.executable, str(SCRIPTS_DIR / argv[0])] + argv[1:]
+
+
+def stage_argv(stage, params, tuning):
+    """Full command line for a script stage."""
+    # Positional values (e.g. --sic, --pages) are already in the command
+    extra = {k: v for k, v in params.items() if k not in ('--sic', '--pages')}
+    return script_argv(stage['command'](params)) + option_args(extra) + option_args(tuning)
+
+
+def file_hash(path, state):
+    """sha256 of a file, re-read only when its size or mtime has changed."""
+    stat = os.stat(path)
+    known = state['files'].get(path)
+    if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+        return known['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    state['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    return digest.hexdigest()
+
+
+def fingerprint(name, stage, params, state):
+    """Hash of a stage's command, output-affecting options and input contents."""
+    digest = hashlib.sha256(json.dumps([name, params], sort_keys=True).encode())
+    for path in _resolve(stage['inputs'], params):
+        digest.update(path.encode())
+        digest.update(file_hash(path, state).encode() if os.path.exists(path) else b'missing')
+    return digest.hexdigest()
+
+
+def stale_reason(name, stage, params, state):
+    """Why a stage needs to run, or None if its cached outputs are still valid."""
+    record = state['stages'].get(state_key(name, stage, params))
+    if record is None:
+        return 'never run'
+    if record['fingerprint'] != fingerprint(name, stage, params, state):
+        return 'inputs or parameters changed'
+    for path, digest in record['outputs'].items():
+        if not os.path.exists(path):
+            return f'{path} missing'
+        if file_hash(path, state) != digest:
+            return f'{path} changed since last run'
+    if stage.get('max_age') and time.time() - record['finished'] > stage['max_age']:
+        return 'out of date'
+    return None
+
+
+def load_state(path=STATE_FILE):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'stages': {}, 'files': {}}
+
+
+def save_state(state, path=STATE_FILE):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def plan(targets):
+    """Stages needed for the targets, upstream first (in STAGES order)."""
+    producers = {}
+    for name, stage in STAGES.items():
+        if not callable(stage['outputs']):
+            for path in stage['outputs']:
+                producers[path] = name
+
+    needed = set()
+
+    def visit(name):
+        if name in needed:
+            return
+        needed.add(name)
+        inputs = STAGES[name]['inputs']
+        for path in inputs if not callable(inputs) else []:
+            if path in producers:
+                visit(producers[path])
+
+    for target in targets:
+        visit(target)
+    return [name for name in STAGES if name in needed]
+
+
+def run_stage(name, stage, params, tuning, refresh=False):
+    """Run one stage. Returns the exit code."""
+    if 'function' in stage:
+        return stage['function'](params)
+
+    if refresh:
+        argv = script_argv(stage['refresh'](params))
+    else:
+        argv = stage_argv(stage, params, tuning)
+    print(f"$ {' '.join(argv[1:])}")
+    return subprocess.run(argv).returncode
+
+
+def run(targets, options):
+    """Run the targets and whatever they depend on, skipping up-to-date stages."""
+    state = load_state()
+    forced = set(targets) if options.get('--force') else set()
+    start = time.time()
+
+    for name in plan(targets):
+        stage = STAGES[name]
+        params, tuning = stage_params(stage, options)
+        missing = [k for k in stage.get('required', []) if not params.get(k)]
+        if missing:
+            print(f"{name}: needs {', '.join(missing)}")
+            sys.exit(1)
+
+        reason = 'forced' if name in forced else stale_reason(name, stage, params, state)
+        if reason is None:
+            print(f"[{name}] up to date - skipped")
+            continue
+
+        # Old but otherwise valid outputs can be refreshed rather than rebuilt
+        refresh = reason == 'out of date' and bool(stage.get('refresh') and stage['refresh'](params))
+        print(f"\n[{name}] running ({reason}{', refreshing' if refresh else ''})")
+        fp = fingerprint(name, stage, params, state)
+        stage_start = time.time()
+
+        with stats.timer(name):
+            code = run_stage(name, stage, params, tuning, refresh)
+        outputs = _resolve(stage['outputs'], params)
+        if code != 0 or not all(os.path.exists(p) for p in outputs):
+            print(f"[{name}] failed (exit code {code}) - stopping")
+            save_state(state)
+            sys.exit(code or 1)
+        if 'complete' in stage and not stage['complete'](params):
+            print(f"[{name}] incomplete - rerun the pipeline to resume")
+            save_state(state)
+            sys.exit(1)
+
+        state['stages'][state_key(name, stage, params)] = {
+            'fingerprint': fp,
+            'params': params,
+            'outputs': {path: file_hash(path, state) for path in outputs},
+            'finished': time.time(),
+            'seconds': round(time.time() - stage_start, 1),
+        }
+        save_state(state)
+        print(f"[{name}] done in {time.time() - stage_start:.0f}s")
+
+    print(f"\nPipeline finished in {time.time() - start:.0f}s")
+
+
+def status(options):
+    state = load_state()
+    for name, stage in STAGES.items():
+        params, _ = stage_params(stage, options)
+        if any(not params.get(k) for k in stage.get('required', [])):
+            print(f"  {name:<12} (needs {', '.join(stage['required'])})")
+            continue
+        reason = stale_reason(name, stage, params, state)
+        record = state['stages'].get(state_key(name, stage, params))
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(record['finished'])) if record else ''
+        print(f"  {name:<12} {'up to date' if reason is None else 'needs run: ' + reason}"
+              f"{f'  (last run {when})' if when else ''}")
+    save_state(state)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    args = sys.argv[2:]
+    options = parse_options(args)
+
+    if command == 'run':
+        # Stage names come before the options
+        targets = []
+        for arg in args:
+            if arg.startswith('--'):
+                break
+            targets.append(arg)
+        targets = targets or DEFAULT_TARGETS
+
+        unknown = [t for t in targets if t not in STAGES]
+        if unknown:
+            print(f"Unknown stage: {', '.join(unknown)} (stages: {', '.join(STAGES)})")
+            sys.exit(1)
+        run(targets, options)
+
+    elif command == 'status':
+        status(options)
+
+    else:
+        print(f"Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    run_main(main, 'pipeline')
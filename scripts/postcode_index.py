@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Offline Postcode Index for Go Owl Digital
+Postcode -> coordinates/region from a local copy of the ONS Postcode Directory
+Download ONSPD: https://geoportal.statistics.gov.uk/ (search "ONS Postcode Directory")
+
+Usage:
+    python postcode_index.py build ONSPD_AUG_2024_UK.zip
+    python postcode_index.py lookup "LS1 4AP"
+    python postcode_index.py distance "LS1 4AP" "YO1 7HH"
+
+The index is one file of sorted fixed-width arrays, memory-mapped and
+binary searched, so lookups need no parsing and almost no RAM.
+"""
+
+import io
+import os
+import sys
+import csv
+import math
+import mmap
+import time
+import struct
+import zipfile
+
+INDEX_FILE = os.environ.get('POSTCODE_INDEX', 'postcodes.idx')
+
+MAGIC = b'PCIDX001'
+KEY_WIDTH = 7  # ONSPD 'pcd' layout: outward code padded to 4, then inward code
+
+# ONS region codes (rgn column)
+REGIONS = {
+    'E12000001': 'North East',
+    'E12000002': 'North West',
+    'E12000003': 'Yorkshire and The Humber',
+    'E12000004': 'East Midlands',
+    'E12000005': 'West Midlands',
+    'E12000006': 'East of England',
+    'E12000007': 'London',
+    'E12000008': 'South East',
+    'E12000009': 'South West',
+    'W99999999': 'Wales',
+    'S99999999': 'Scotland',
+    'N99999999': 'Northern Ireland',
+}
+
+
+def postcode_key(postcode):
+    """Normalise a postcode to the fixed-width index key, e.g. 'ls14ap' -> b'LS1 4AP'."""
+    compact = ''.join(postcode.split()).upper()
+    key = compact[:-3].ljust(4) + compact[-3:]
+    return key.encode('ascii', 'ignore')[:KEY_WIDTH].ljust(KEY_WIDTH)
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _open_onspd(path):
+    """Yield CSV text streams from an ONSPD csv or zip (read in place, not extracted)."""
+    if not zipfile.is_zipfile(path):
+        yield open(path, 'r', newline='', encoding='utf-8-sig')
+        return
+
+    archive = zipfile.ZipFile(path)
+    for name in archive.namelist():
+        # The main file lives in Data/; Data/multi_csv/ repeats it split by area
+        if name.lower().endswith('.csv') and 'onspd' in name.lower() and 'multi_csv' not in name.lower():
+            yield io.TextIOWrapper(archive.open(name), encoding='utf-8-sig', newline='')
+
+
+def build_index(onspd_path, index_file=INDEX_FILE):
+    """Build the index file from the ONS Postcode Directory."""
+    start = time.time()
+    region_codes = list(REGIONS)
+    region_ids = {code: i for i, code in enumerate(region_codes)}
+    records = []
+
+    print(f"Reading {onspd_path}...")
+    for handle in _open_onspd(onspd_path):
+        with handle:
+            for row in csv.DictReader(handle):
+                if row.get('doterm'):
+                    continue  # Terminated postcode
+                try:
+                    lat = float(row['lat'])
+                    lon = float(row['long'])
+                except (KeyError, ValueError):
+                    continue
+                if lat > 90:
+                    continue  # 99.999999 marks "no grid reference"
+
+                region = row.get('rgn', '')
+                if region not in region_ids:
+                    region_ids[region] = len(region_codes)
+                    region_codes.append(region)
+
+                key = postcode_key(row.get('pcds') or row.get('pcd', ''))
+                records.append(key + struct.pack('<ffB', lat, lon, region_ids[region]))
+
+    # Records start with the key, so sorting the bytes sorts by postcode
+    records.sort()
+    count = len(records)
+    print(f"  {count} live postcodes, sorted in {time.time() - start:.0f}s")
+
+    keys_offset = _align(len(MAGIC) + 8 + len(region_codes) * 9)
+    lat_offset = _align(keys_offset + count * KEY_WIDTH)
+
+    with open(index_file + '.tmp', 'wb') as f:
+        f.write(MAGIC + struct.pack('<II', count, len(region_codes)))
+        for code in region_codes:
+            f.write(code.encode('ascii').ljust(9))
+
+        f.seek(keys_offset)
+        for rec in records:
+            f.write(rec[:KEY_WIDTH])
+        # Then the lat, lon and region arrays, back to back
+        f.seek(lat_offset)
+        f.write(b''.join(rec[KEY_WIDTH:KEY_WIDTH + 4] for rec in records))
+        f.write(b''.join(rec[KEY_WIDTH + 4:KEY_WIDTH + 8] for rec in records))
+        f.write(b''.join(rec[KEY_WIDTH + 8:] for rec in records))
+
+    os.replace(index_file + '.tmp', index_file)
+    size = os.path.getsize(index_file) / 1e6
+    print(f"Saved {index_file} ({size:.0f} MB) in {time.time() - start:.0f}s")
+    return count
+
+
+class PostcodeIndex:
+    """Memory-mapped view of an index file built by build_index."""
+
+    def __init__(self, index_file=INDEX_FILE):
+        self.file = open(index_file, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{index_file} is not a postcode index")
+
+        self.count, region_count = struct.unpack_from('<II', self.mm, len(MAGIC))
+        table = len(MAGIC) + 8
+        self.regions = [self.mm[table + i * 9:table + (i + 1) * 9].decode('ascii').strip()
+                        for i in range(region_count)]
+
+        self.keys_offset = _align(table + region_count * 9)
+        lat_offset = _align(self.keys_offset + self.count * KEY_WIDTH)
+        view = memoryview(self.mm)
+        self.lat = view[lat_offset:lat_offset + self.count * 4].cast('f')
+        self.lon = view[lat_offset + self.count * 4:lat_offset + self.count * 8].cast('f')
+        self.region = view[lat_offset + self.count * 8:lat_offset + self.count * 9]
+
+    def __len__(self):
+        return self.count
+
+    def _key(self, i):
+        start = self.keys_offset + i * KEY_WIDTH
+        return self.mm[start:start + KEY_WIDTH]
+
+    def _bisect(self, key):
+        """Index of the first key >= key."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, postcode):
+        """Return (lat, lon, region_code) for a full postcode, or None."""
+        key = postcode_key(postcode)
+        i = self._bisect(key)
+        if i < self.count and self._key(i) == key:
+            return self.lat[i], self.lon[i], self.regions[self.region[i]]
+        return None
+
+    def locate(self, place):
+        """
+        Coordinates for a full postcode, or for a district/sector like 'LS1'
+        or 'LS1 4' (the first postcode in it).
+        """
+        found = self.lookup(place)
+        if found or not place.strip():
+            return found
+
+        # District 'LS1' must not match 'LS10', so pad the outward code like the keys
+        parts = place.upper().split()
+        prefix = (parts[0].ljust(4) + ''.join(parts[1:])).encode('ascii', 'ignore')
+        i = self._bisect(prefix)
+        if i < self.count and self._key(i).startswith(prefix):
+            return self.lat[i], self.lon[i], self.regions[self.region[i]]
+        return None
+
+    def close(self):
+        self.lat.release()
+        self.lon.release()
+        self.region.release()
+        self.mm.close()
+        self.file.close()
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance in miles."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 3958.8 * 2 * math.asin(math.sqrt(a))
+
+
+def region_code(region):
+    """Accept an ONS region code or name ('Yorkshire and The Humber', 'london')."""
+    region = region.strip()
+    if region.upper() in REGIONS:
+        return region.upper()
+    for code, name in REGIONS.items():
+        if name.lower() == region.lower():
+            return code
+    raise ValueError(f"Unknown region: {region} (known: {', '.join(REGIONS.values())})")
+
+
+def filter_by_location(rows, index, near=None, radius=None, region=None, postcode_field='postcode'):
+    """
+    Keep rows whose postcode is within radius miles of near, and/or in region.
+    Rows with a postcode the index doesn't know are dropped.
+    """
+    centre = None
+    if near:
+        centre = index.locate(near)
+        if centre is None:
+            raise ValueError(f"Unknown postcode: {near}")
+    wanted_region = region_code(region) if region else None
+
+    # Cheap bounding box test before the trig
+    if centre and radius:
+        lat_span = radius / 69.0
+        lon_span = radius / (69.0 * max(math.cos(math.radians(centre[0])), 0.01))
+
+    for row in rows:
+        found = index.lookup(row.get(postcode_field, ''))
+        if found is None:
+            continue
+        lat, lon, row_region = found
+
+        if wanted_region and row_region != wanted_region:
+            continue
+        if centre and radius:
+            if abs(lat - centre[0]) > lat_span or abs(lon - centre[1]) > lon_span:
+                continue
+            if haversine_miles(centre[0], centre[1], lat, lon) > radius:
+                continue
+        yield row
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == 'build':
+        if len(sys.argv) < 3:
+            print("Usage: python postcode_index.py build <ONSPD.zip|ONSPD.csv>")
+            sys.exit(1)
+
+        build_index(sys.argv[2])
+
+    elif command == 'lookup':
+        if len(sys.argv) < 3:
+            print("Usage: python postcode_index.py lookup <postcode>")
+            sys.exit(1)
+
+        index = PostcodeIndex()
+        found = index.locate(sys.argv[2])
+        if found:
+            lat, lon, region = found
+            print(f"  {sys.argv[2].upper()}: {lat:.5f}, {lon:.5f} ({REGIONS.get(region, region)})")
+        else:
+            print("Postcode not found")
+            sys.exit(1)
+
+    elif command == 'distance':
+        if len(sys.argv) < 4:
+            print("Usage: python postcode_index.py distance <postcode> <postcode>")
+            sys.exit(1)
+
+        index = PostcodeIndex()
+        a = index.locate(sys.argv[2])
+        b = index.locate(sys.argv[3])
+        if not a or not b:
+            print("Postcode not found")
+            sys.exit(1)
+        print(f"  {haversine_miles(a[0], a[1], b[0], b[1]):.1f} miles")
+
+    else:
+        print(f"Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
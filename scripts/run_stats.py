@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Run statistics for the outreach scripts.
+Times stages, HTTP requests, sleeps, extraction and CSV I/O, and writes a
+JSON report at the end of every run (plus an optional Prometheus textfile).
+
+Usage (added to any script command):
+    python email_scraper.py scrape-list websites.txt --metrics-file /var/lib/node_exporter/outreach.prom
+    python cqc_email_builder.py build-list cqc_care_homes.csv --profile
+
+Reports go to run_reports/<script>-<command>-<time>.json (RUN_REPORT_DIR overrides).
+"""
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import resource
+import threading
+import requests
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+REPORT_DIR = os.environ.get('RUN_REPORT_DIR', 'run_reports')
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf')]
+
+
+def _new_domain():
+    return {'requests': 0, 'bytes': 0, 'errors': 0, 'timeouts': 0, 'seconds': 0.0,
+            'latency': [0] * len(LATENCY_BUCKETS)}
+
+
+class RunStats:
+    """
+    Counters, timers and latency histograms for one run. Safe to share
+    between threads. Timer totals are summed across threads, so with a
+    worker pool they can add up to more than the wall-clock time.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.script = ''
+        self.command = ''
+        self.argv = []
+        self.started = time.time()
+        self.exit_code = 0
+        self.timers = {}  # name -> [seconds, calls]
+        self.counters = {}
+        self.status_codes = {}
+        self.domains = {}
+
+    def start(self, script, argv):
+        self.script = script
+        self.command = argv[0] if argv else ''
+        self.argv = list(argv)
+        self.started = time.time()
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            timer = self.timers.setdefault(name, [0.0, 0])
+            timer[0] += seconds
+            timer[1] += 1
+
+    @contextmanager
+    def timer(self, name):
+        """Time a block: with stats.timer('csv'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def sleep(self, seconds, name='sleep'):
+        """time.sleep, counted under the 'sleep' timer (or name)."""
+        if seconds > 0:
+            time.sleep(seconds)
+            self.add_time(name, seconds)
+
+    def record_request(self, url, seconds, nbytes=0, status=None, error=None):
+        """Record one HTTP request against its host."""
+        host = urlparse(url).hostname or ''
+        with self.lock:
+            domain = self.domains.get(host)
+            if domain is None:
+                domain = self.domains[host] = _new_domain()
+            domain['requests'] += 1
+            domain['bytes'] += nbytes
+            domain['seconds'] += seconds
+            domain['latency'][next(i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound)] += 1
+            if error == 'timeout':
+                domain['timeouts'] += 1
+            elif error:
+                domain['errors'] += 1
+            if status is not None:
+                self.status_codes[status] = self.status_codes.get(status, 0) + 1
+        self.add_time('http', seconds)
+
+    def add_bytes(self, url, nbytes):
+        """Body bytes read after the request was recorded (streamed downloads)."""
+        host = urlparse(url).hostname or ''
+        with self.lock:
+            domain = self.domains.get(host)
+            if domain is None:
+                domain = self.domains[host] = _new_domain()
+            domain['bytes'] += nbytes
+
+    def get(self, get, url, **kwargs):
+        """
+        Call get(url, **kwargs) - requests.get or a session's get - and record
+        its latency (to headers when streaming), bytes, status and failures.
+        """
+        start = time.perf_counter()
+        try:
+            response = get(url, **kwargs)
+        except requests.Timeout:
+            self.record_request(url, time.perf_counter() - start, error='timeout')
+            raise
+        except Exception:
+            self.record_request(url, time.perf_counter() - start, error='error')
+            raise
+        nbytes = 0 if kwargs.get('stream') else len(response.content)
+        self.record_request(url, time.perf_counter() - start, nbytes, response.status_code)
+        return response
+
+    def totals(self):
+        """Request, byte, error and timeout totals over every host."""
+        keys = ('requests', 'bytes', 'errors', 'timeouts')
+        with self.lock:
+            return {key: sum(d[key] for d in self.domains.values()) for key in keys}
+
+    def report(self):
+        """Everything recorded so far, as a JSON-serialisable dict."""
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        latency = [0] * len(LATENCY_BUCKETS)
+        with self.lock:
+            for domain in self.domains.values():
+                latency = [a + b for a, b in zip(latency, domain['latency'])]
+            domains = {
+                host: dict(d, seconds=round(d['seconds'], 3),
+                           latency=dict(zip(map(str, LATENCY_BUCKETS), d['latency'])))
+                for host, d in sorted(self.domains.items(), key=lambda item: -item[1]['seconds'])
+            }
+            report = {
+                'script': self.script,
+                'command': self.command,
+                'argv': self.argv,
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'wall_seconds': round(time.time() - self.started, 3),
+                'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 3),
+                'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),  # ru_maxrss is KB on Linux
+                'exit_code': self.exit_code,
+                'timers': {name: {'seconds': round(t[0], 3), 'calls': t[1]}
+                           for name, t in sorted(self.timers.items())},
+                'counters': dict(sorted(self.counters.items())),
+                'http': {'status_codes': {str(k): v for k, v in sorted(self.status_codes.items())},
+                         'latency': dict(zip(map(str, LATENCY_BUCKETS), latency))},
+            }
+        report['http'].update(self.totals())
+        report['domains'] = domains
+        return report
+
+    def write_report(self, path=None):
+        """Write the JSON report. Returns its path."""
+        if path is None:
+            os.makedirs(REPORT_DIR, exist_ok=True)
+            stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+            path = os.path.join(REPORT_DIR, f"{self.script}-{self.command or 'none'}-{stamp}.json")
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def write_prometheus(self, path):
+        """
+        Write a node_exporter textfile. Per-host detail stays in the JSON
+        report - a label per care-home domain would be too many series.
+        """
+        report = self.report()
+        labels = f'script="{self.script}",command="{self.command}"'
+        lines = [
+            '# TYPE outreach_run_wall_seconds gauge',
+            f'outreach_run_wall_seconds{{{labels}}} {report["wall_seconds"]}',
+            '# TYPE outreach_run_peak_rss_bytes gauge',
+            f'outreach_run_peak_rss_bytes{{{labels}}} {report["peak_rss_mb"] * 1024 * 1024:.0f}',
+            '# TYPE outreach_run_timestamp_seconds gauge',
+            f'outreach_run_timestamp_seconds{{{labels}}} {self.started:.0f}',
+            '# TYPE outreach_stage_seconds_total counter',
+        ]
+        for name, timer in report['timers'].items():
+            lines.append(f'outreach_stage_seconds_total{{{labels},stage="{name}"}} {timer["seconds"]}')
+        lines.append('# TYPE outreach_events_total counter')
+        for name, value in report['counters'].items():
+            lines.append(f'outreach_events_total{{{labels},event="{name}"}} {value}')
+        for key in ('requests', 'bytes', 'errors', 'timeouts'):
+            lines.append(f'# TYPE outreach_http_{key}_total counter')
+            lines.append(f'outreach_http_{key}_total{{{labels}}} {report["http"][key]}')
+
+        lines.append('# TYPE outreach_http_latency_seconds histogram')
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, report['http']['latency'].values()):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else bound
+            lines.append(f'outreach_http_latency_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f'outreach_http_latency_seconds_sum{{{labels}}} '
+                     f'{report["timers"].get("http", {}).get("seconds", 0)}')
+        lines.append(f'outreach_http_latency_seconds_count{{{labels}}} {cumulative}')
+
+        # Written then renamed, so the collector never reads half a file
+        with open(path + '.tmp', 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(path + '.tmp', path)
+
+
+stats = RunStats()
+
+
+def run_main(main, script):
+    """
+    Run a script's main() and write the run report when it finishes (or
+    fails). Handles --profile and --metrics-file FILE, removing them from
+    sys.argv before main() parses it.
+    """
+    profile = '--profile' in sys.argv
+    if profile:
+        sys.argv.remove('--profile')
+    metrics_file = None
+    if '--metrics-file' in sys.argv:
+        idx = sys.argv.index('--metrics-file')
+        metrics_file = sys.argv[idx + 1]
+        del sys.argv[idx:idx + 2]
+
+    if len(sys.argv) < 2:
+        return main()  # Usage message - nothing to report
+
+    stats.start(script, sys.argv[1:])
+    profiler = cProfile.Profile() if profile else None
+    try:
+        if profiler:
+            profiler.runcall(main)
+        else:
+            main()
+    except SystemExit as e:
+        stats.exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        raise
+    except KeyboardInterrupt:
+        stats.exit_code = 'interrupted'
+        raise
+    except BaseException:
+        stats.exit_code = 'error'
+        raise
+    finally:
+        path = stats.write_report()
+        if metrics_file:
+            stats.write_prometheus(metrics_file)
+        if profiler:
+            profile_path = path[:-len('.json')] + '.prof'
+            profiler.dump_stats(profile_path)
+            print(f"\nProfile saved to {profile_path} - top functions by cumulative time:")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+        summarise(path)
+
+
+def summarise(path):
+    """One line of what the time went on, printed at the end of a run."""
+    report = stats.report()
+    timers = report['timers']
+    parts = [f"{name} {timers[name]['seconds']:.1f}s" for name in ('http', 'sleep', 'rate_limit', 'extract', 'csv')
+             if name in timers]
+    http = report['http']
+    print(f"\nRun report: {path} ({report['wall_seconds']:.1f}s wall; "
+          f"{http['requests']} requests, {http['bytes'] / 1e6:.1f} MB, "
+          f"{http['errors']} errors, {http['timeouts']} timeouts"
+          f"{'; ' + ', '.join(parts) if parts else ''})")
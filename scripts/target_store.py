@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Outreach Target Store for Go Owl Digital
+Keeps every target we have built, across campaigns, plus opt-outs
+
+Usage:
+    python target_store.py suppress someone@example-carehome.co.uk "Replied STOP"
+    python target_store.py suppress example-carehome.co.uk
+    python target_store.py import-suppressions optouts.csv
+    python target_store.py export new_targets.csv --since-campaign 2024-W41
+    python target_store.py stats
+"""
+
+import os
+import sys
+import csv
+import time
+import sqlite3
+import threading
+from datetime import date
+from email_scraper import site_key, registrable_domain
+
+STORE_FILE = os.environ.get('OUTREACH_STORE', 'outreach.db')
+
+TARGET_FIELDS = ['care_home', 'email', 'website', 'rating', 'town', 'phone', 'source']
+
+
+def current_campaign():
+    """Default campaign name: the ISO week, e.g. '2024-W41'."""
+    year, week, _ = date.today().isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def email_domain(email):
+    return email.rsplit('@', 1)[-1].lower()
+
+
+def suppression_value(value):
+    """
+    An opt-out as stored: an email address lowercased, or a domain or URL
+    reduced to the site key build-list checks ('https://www.sunny.co.uk/'
+    -> 'sunny.co.uk').
+    """
+    value = value.strip().lower()
+    if value.startswith('mailto:'):
+        value = value[len('mailto:'):]
+    if '@' in value:
+        return value
+    return site_key(value)
+
+
+class TargetStore:
+    """
+    SQLite store with unique keys on email, company number and suppression.
+    Suppressed and previously contacted domains are held in memory so
+    checks during a build are O(1).
+    """
+
+    def __init__(self, path=STORE_FILE, campaign=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS campaigns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE, started_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS targets (
+                email TEXT PRIMARY KEY, domain TEXT, site_domain TEXT,
+                care_home TEXT, website TEXT, rating TEXT, town TEXT, phone TEXT, source TEXT,
+                campaign_id INTEGER, added_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_targets_domain ON targets (domain);
+            CREATE INDEX IF NOT EXISTS idx_targets_campaign ON targets (campaign_id);
+            CREATE TABLE IF NOT EXISTS companies (
+                company_number TEXT PRIMARY KEY,
+                company_name TEXT, status TEXT, address TEXT, town TEXT, postcode TEXT,
+                sic_codes TEXT, directors TEXT, matched_sic TEXT,
+                campaign_id INTEGER, added_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_companies_campaign ON companies (campaign_id);
+            CREATE TABLE IF NOT EXISTS suppressions (
+                value TEXT PRIMARY KEY, kind TEXT, reason TEXT, added_at REAL
+            );
+        """)
+
+        self.campaign = campaign or current_campaign()
+        self._campaign_id = None
+
+        # Normalised again in case the value was stored before normalisation was added
+        self.suppressed = {suppression_value(row[0]) for row in self.conn.execute('SELECT value FROM suppressions')}
+        # Both the email domain and the website it was found on count as contacted
+        self.contacted_domains = set()
+        for domain, site_domain in self.conn.execute("""
+                SELECT DISTINCT t.domain, t.site_domain FROM targets t
+                JOIN campaigns c ON c.id = t.campaign_id WHERE c.name != ?""", (self.campaign,)):
+            self.contacted_domains.update(d for d in (domain, site_domain) if d)
+
+    @property
+    def campaign_id(self):
+        """Campaign row for this run, created on first write (lock held)."""
+        if self._campaign_id is None:
+            self.conn.execute('INSERT OR IGNORE INTO campaigns (name, started_at) VALUES (?, ?)',
+                              (self.campaign, time.time()))
+            self._campaign_id = self.conn.execute(
+                'SELECT id FROM campaigns WHERE name = ?', (self.campaign,)).fetchone()[0]
+        return self._campaign_id
+
+    def is_suppressed(self, email):
+        """True if the address or its whole domain has opted out."""
+        email = email.lower()
+        domain = email_domain(email)
+        return (email in self.suppressed or domain in self.suppressed
+                or registrable_domain(domain) in self.suppressed)
+
+    def skip_domain(self, domain, include_contacted=False):
+        """True if a site (its site_key) should not be scraped at all this campaign."""
+        return domain in self.suppressed or (not include_contacted and domain in self.contacted_domains)
+
+    def add_target(self, target):
+        """Record a target for this campaign. Returns False if known or suppressed."""
+        email = target['email'].lower()
+        if self.is_suppressed(email):
+            return False
+        with self.lock:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO targets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (email, email_domain(email), site_key(target.get('website', '')),
+                 target.get('care_home', ''), target.get('website', ''),
+                 target.get('rating', ''), target.get('town', ''), target.get('phone', ''),
+                 target.get('source', ''), self.campaign_id, time.time()))
+            self._maybe_commit()
+        return cursor.rowcount == 1
+
+    def add_company(self, row):
+        """Record a Companies House target for this campaign. Returns False if known."""
+        with self.lock:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO companies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (row.get('company_number', ''), row.get('company_name', ''), row.get('status', ''),
+                 row.get('address', ''), row.get('town', ''), row.get('postcode', ''),
+                 row.get('sic_codes', ''), row.get('directors', ''), row.get('matched_sic', ''),
+                 self.campaign_id, time.time()))
+            self._maybe_commit()
+        return cursor.rowcount == 1
+
+    def suppress(self, value, reason=''):
+        """Opt out an email address or a whole domain (a bare domain or any URL on it)."""
+        value = suppression_value(value)
+        if not value:
+            raise ValueError("Not an email address or domain")
+        kind = 'email' if '@' in value else 'domain'
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO suppressions VALUES (?, ?, ?, ?)',
+                              (value, kind, reason, time.time()))
+            self.conn.commit()
+        self.suppressed.add(value)
+        return kind
+
+    def export(self, output_file, since_campaign=None):
+        """Write targets added after since_campaign (or all), minus suppressions."""
+        sql = 'SELECT care_home, email, website, rating, town, phone, source FROM targets'
+        params = []
+        if since_campaign:
+            row = self.conn.execute('SELECT id FROM campaigns WHERE name = ?', (since_campaign,)).fetchone()
+            if row is None:
+                print(f"Unknown campaign: {since_campaign}")
+                return 0
+            sql += ' WHERE campaign_id > ?'
+            params.append(row[0])
+
+        count = 0
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(TARGET_FIELDS)
+            for row in self.conn.execute(sql, params):
+                if not self.is_suppressed(row[1]):
+                    writer.writerow(row)
+                    count += 1
+
+        print(f"Exported {count} targets to {output_file}")
+        return count
+
+    def _maybe_commit(self):
+        # Commit in small batches - a crash loses at most a few rows (lock held)
+        self.pending += 1
+        if self.pending >= 50:
+            self.conn.commit()
+            self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == 'suppress':
+        if len(sys.argv) < 3:
+            print("Usage: python target_store.py suppress <email|domain> [reason]")
+            sys.exit(1)
+
+        store = TargetStore()
+        reason = sys.argv[3] if len(sys.argv) > 3 else ''
+        try:
+            kind = store.suppress(sys.argv[2], reason)
+        except ValueError as e:
+            print(f"{e}: {sys.argv[2]}")
+            sys.exit(1)
+        finally:
+            store.close()
+        print(f"Suppressed {kind}: {suppression_value(sys.argv[2])}")
+
+    elif command == 'import-suppressions':
+        if len(sys.argv) < 3:
+            print("Usage: python target_store.py import-suppressions <optouts.csv>")
+            sys.exit(1)
+
+        # First column of each row is an email or domain
+        store = TargetStore()
+        count = 0
+        with open(sys.argv[2], 'r', encoding='utf-8-sig') as f:
+            for row in csv.reader(f):
+                if row and row[0].strip() and row[0].strip().lower() not in ('email', 'domain'):
+                    try:
+                        store.suppress(row[0], 'imported')
+                    except ValueError:
+                        print(f"  Skipped {row[0]!r}: not an email address or domain")
+                        continue
+                    count += 1
+        store.close()
+        print(f"Imported {count} suppressions")
+
+    elif command == 'export':
+        if len(sys.argv) < 3:
+            print("Usage: python target_store.py export <output.csv> [--since-campaign NAME]")
+            sys.exit(1)
+
+        since = None
+        if '--since-campaign' in sys.argv:
+            idx = sys.argv.index('--since-campaign')
+            since = sys.argv[idx + 1]
+
+        store = TargetStore()
+        store.export(sys.argv[2], since_campaign=since)
+        store.close()
+
+    elif command == 'stats':
+        store = TargetStore()
+        print(f"Store: {store.path}")
+        for name, started, targets in store.conn.execute("""
+                SELECT c.name, c.started_at, COUNT(t.email)
+                FROM campaigns c LEFT JOIN targets t ON t.campaign_id = c.id
+                GROUP BY c.id ORDER BY c.id"""):
+            print(f"  {name}: {targets} targets (started {time.strftime('%Y-%m-%d', time.localtime(started))})")
+        companies = store.conn.execute('SELECT COUNT(*) FROM companies').fetchone()[0]
+        print(f"  Companies: {companies}")
+        print(f"  Suppressions: {len(store.suppressed)}")
+        store.close()
+
+    else:
+        print(f"Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
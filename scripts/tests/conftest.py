@@ -0,0 +1,87 @@
+"""
+Shared fixtures. The scripts are plain modules in the directory above,
+so it goes on sys.path; each test runs in its own temporary directory so
+the caches, checkpoints and CSVs the scripts write there start empty.
+"""
+
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['NO_PROXY'] = '*'
+
+import cqc_email_builder as cqc  # noqa: E402 - needs the path above
+from bench_pipeline import DEFAULTS, BenchHandler, FakeServices  # noqa: E402
+
+
+class CQCHandler(BenchHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] in self.server.failing:
+            self.respond(503, 'application/json', b'{}')
+        else:
+            super().do_GET()
+
+
+class CQCServices(FakeServices):
+    """
+    bench_pipeline's CQC fake with a changes listing to fill in and paths
+    (e.g. '/cqc/locations/1-2') that answer 503 while in failing.
+    Locations past the last home are 404s.
+    """
+
+    def __init__(self, homes):
+        super().__init__(dict(DEFAULTS, **{'--homes': homes, '--latency': 0}))
+        self.RequestHandlerClass = CQCHandler
+        self.changes = []
+        self.failing = set()
+
+    def cqc(self, path, query):
+        if path == '/changes/location':
+            return {'changes': self.changes, 'total': len(self.changes), 'page': 1, 'totalPages': 1}
+        return super().cqc(path, query)
+
+
+@pytest.fixture(autouse=True)
+def in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def serve():
+    """serve(handler_class) -> base URL of a local server for this test."""
+    servers = []
+
+    def start(handler):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_address[1]}'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def cqc_services(request, monkeypatch):
+    """CQCServices with cqc_email_builder pointed at it; homes from @pytest.mark.homes(n), default 3."""
+    marker = request.node.get_closest_marker('homes')
+    server = CQCServices(marker.args[0] if marker else 3).start()
+    api = server.api_url('cqc')
+    monkeypatch.setattr(cqc, 'CQC_LOCATIONS_URL', f'{api}/locations')
+    monkeypatch.setattr(cqc, 'CQC_CHANGES_URL', f'{api}/changes/location')
+    monkeypatch.setattr(cqc, 'details_pacer', cqc.RequestPacer(10 ** 6))
+    monkeypatch.setattr(cqc, '_cache', None)
+    yield server
+    server.close()
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'homes(n): number of CQC locations the cqc_services fake lists')
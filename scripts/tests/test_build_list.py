@@ -0,0 +1,102 @@
+"""cqc_email_builder.build_email_list with the per-home scrape stubbed out."""
+
+import random
+import threading
+import time
+
+import pytest
+
+import cqc_email_builder as cqc
+from target_store import TargetStore
+
+
+def homes(n):
+    return [{'location_id': f'1-{i}', 'name': f'Home {i}', 'website': f'https://home{i}.co.uk/'}
+            for i in range(n)]
+
+
+@pytest.fixture
+def scraped(monkeypatch):
+    """Stands in for find_emails; records the homes it was asked about."""
+    calls = []
+    lock = threading.Lock()
+    rng = random.Random(7)
+
+    def find_emails(home, scrape_websites=True):
+        with lock:
+            calls.append(home['location_id'])
+            delay = rng.uniform(0, 0.02)
+        time.sleep(delay)  # Finish out of order
+        i = home['location_id'].split('-')[1]
+        return [f'info@home{i}.co.uk'], 'scraped', 'SCRAPED: 1'
+
+    monkeypatch.setattr(cqc, 'find_emails', find_emails)
+    monkeypatch.setattr(cqc, '_scraped_domains', {})
+    return calls
+
+
+def test_results_in_input_order(scraped):
+    targets = cqc.build_email_list(homes(30), max_targets=100, workers=8)
+    assert [t['email'] for t in targets] == [f'info@home{i}.co.uk' for i in range(30)]
+    assert sorted(scraped) == sorted(f'1-{i}' for i in range(30))
+
+
+def test_stops_scraping_at_max_targets(scraped):
+    targets = cqc.build_email_list(homes(200), max_targets=10, workers=4)
+    assert len(targets) == 10
+    # Only a bounded window beyond the tenth home was started
+    assert len(scraped) <= 10 + 4 * 2 + 4
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_journal_resumes_without_rescraping(scraped, monkeypatch, in_tmp):
+    journal = str(in_tmp / 'careowl_targets.journal')
+    scope = {'campaign': '2026-W42', 'input': 'abc'}
+    find_emails = cqc.find_emails
+
+    def crash_at_home_12(home, scrape_websites=True):
+        if home['location_id'] == '1-12':
+            raise Interrupted
+        return find_emails(home, scrape_websites)
+
+    monkeypatch.setattr(cqc, 'find_emails', crash_at_home_12)
+    with pytest.raises(Interrupted):
+        cqc.build_email_list(homes(20), workers=1, journal_file=journal, journal_scope=scope)
+    assert scraped[:12] == [f'1-{i}' for i in range(12)]
+
+    monkeypatch.setattr(cqc, 'find_emails', find_emails)
+    monkeypatch.setattr(cqc, '_scraped_domains', {})
+    scraped.clear()
+    targets = cqc.build_email_list(homes(20), workers=4, journal_file=journal, journal_scope=scope)
+
+    assert sorted(scraped) == sorted(f'1-{i}' for i in range(12, 20))
+    assert [t['email'] for t in targets] == [f'info@home{i}.co.uk' for i in range(20)]
+
+
+def test_journal_from_another_campaign_is_set_aside(scraped, in_tmp):
+    journal = str(in_tmp / 'careowl_targets.journal')
+    cqc.build_email_list(homes(5), journal_file=journal, journal_scope={'campaign': 'W41', 'input': 'abc'})
+    scraped.clear()
+
+    cqc.build_email_list(homes(5), journal_file=journal, journal_scope={'campaign': 'W42', 'input': 'abc'})
+
+    assert len(scraped) == 5
+    assert (in_tmp / 'careowl_targets.journal.old').exists()
+
+
+def test_replayed_homes_still_skip_contacted_sites(scraped, in_tmp):
+    journal = str(in_tmp / 'careowl_targets.journal')
+    scope = {'campaign': 'W42', 'input': 'abc'}
+    cqc.build_email_list(homes(5), journal_file=journal, journal_scope=scope)
+
+    store = TargetStore(str(in_tmp / 'targets.db'), campaign='W42')
+    try:
+        store.suppress('home3.co.uk')
+        targets = cqc.build_email_list(homes(5), journal_file=journal, journal_scope=scope, store=store)
+    finally:
+        store.close()
+    assert 'info@home3.co.uk' not in {t['email'] for t in targets}
+    assert len(targets) == 4
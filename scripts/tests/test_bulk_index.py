@@ -0,0 +1,51 @@
+"""The local SIC index built from the Companies House bulk snapshot."""
+
+import csv
+import zipfile
+
+import pytest
+
+import companies_house
+
+BULK_HEADER = ['CompanyName', ' CompanyNumber', 'RegAddress.AddressLine1', 'RegAddress.PostTown',
+               'RegAddress.PostCode', 'CompanyStatus', 'SICCode.SicText_1', 'SICCode.SicText_2',
+               'SICCode.SicText_3', 'SICCode.SicText_4']
+
+
+def bulk_row(number, status, postcode, *sic):
+    sic = list(sic) + ['None Supplied'] * (4 - len(sic))
+    return [f'COMPANY {number} LTD', number, '1 High St', 'Leeds', postcode, status, *sic]
+
+
+@pytest.fixture
+def bulk_zip(in_tmp):
+    rows = [
+        bulk_row('00000001', 'Active', 'LS1 1AA', '87300 - Residential care activities for the elderly'),
+        bulk_row('00000002', 'Active - Proposal to Strike off', 'M1 1AA', '87300 - Residential care', '87100 - Nursing'),
+        bulk_row('00000003', 'Dissolved', 'LS2 2BB', '87300 - Residential care'),
+        bulk_row('00000004', 'Active', 'LS3 3CC', '49410 - Freight transport by road'),
+    ]
+    csv_path = in_tmp / 'part1.csv'
+    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(BULK_HEADER)
+        writer.writerows(rows)
+    path = in_tmp / 'BasicCompanyData.zip'
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.write(csv_path, 'part1.csv')
+    return str(path)
+
+
+def test_ingest_and_search_bulk_index(bulk_zip, in_tmp):
+    db = str(in_tmp / 'bulk.db')
+    assert companies_house.ingest_bulk([bulk_zip], db_path=db) == 4
+
+    found = companies_house.search_bulk_index('87300', db_path=db)['items']
+    assert sorted(item['company_number'] for item in found) == ['00000001', '00000002']
+    assert found[0]['address_snippet'] == '1 High St, Leeds, LS1 1AA'
+
+    in_leeds = companies_house.search_bulk_index('87300', postcode_area='ls', db_path=db)['items']
+    assert [item['company_number'] for item in in_leeds] == ['00000001']
+
+    assert companies_house.search_bulk_index('87300', status=None, limit=10, db_path=db)['total_results'] == 3
+    assert companies_house.search_bulk_index('87100', db_path=db)['items'][0]['company_number'] == '00000002'
@@ -0,0 +1,31 @@
+"""Paged Companies House search against the fake from bench_pipeline."""
+
+import pytest
+
+import companies_house
+from bench_pipeline import DEFAULTS, FakeServices
+
+
+@pytest.fixture
+def services(monkeypatch):
+    server = FakeServices(dict(DEFAULTS, **{'--companies': 250, '--latency': 0})).start()
+    monkeypatch.setattr(companies_house, 'BASE_URL', server.api_url('ch'))
+    monkeypatch.setattr(companies_house, 'API_KEY', 'test')
+    yield server
+    server.close()
+
+
+@pytest.mark.parametrize('limit, expected', [(10, 10), (230, 230), (1000, 250)])
+def test_search_pages_up_to_limit(services, limit, expected):
+    items = list(companies_house.iter_search_companies('bench', limit=limit))
+    assert len(items) == expected
+    assert len({item['company_number'] for item in items}) == expected
+
+
+def test_search_is_lazy(services):
+    requests_before = companies_house.stats.totals()['requests']
+    results = companies_house.iter_search_companies('bench', limit=250)
+    next(results)
+    results.close()
+    # The first page, plus at most the prefetched second
+    assert companies_house.stats.totals()['requests'] - requests_before <= 2
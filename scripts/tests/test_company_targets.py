@@ -0,0 +1,50 @@
+"""Concurrent, rate-limited target list building against the Companies House fake."""
+
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import companies_house
+from bench_pipeline import COMPANY_BASE, DEFAULTS, SIC_CODE, FakeServices
+
+
+@pytest.fixture
+def services(monkeypatch):
+    server = FakeServices(dict(DEFAULTS, **{'--companies': 40, '--latency': 0.01})).start()
+    monkeypatch.setattr(companies_house, 'BASE_URL', server.api_url('ch'))
+    monkeypatch.setattr(companies_house, 'API_KEY', 'test')
+    monkeypatch.setattr(companies_house, 'rate_limiter', companies_house.RateLimiter(10 ** 9, 1, 10 ** 9))
+    monkeypatch.setattr(companies_house, '_cache', None)
+    yield server
+    server.close()
+
+
+def test_build_target_list_keeps_search_order(services, in_tmp):
+    companies = [{'company_number': str(COMPANY_BASE + i), 'title': f'BENCH CARE {i} LIMITED',
+                  'company_status': 'active'} for i in range(40)]
+    companies.append({'company_number': '99999999', 'title': 'GONE LTD', 'company_status': 'dissolved'})
+    companies.append({'company_number': '99999998', 'title': 'MISSING LTD', 'company_status': 'active'})
+
+    targets = companies_house.build_target_list(iter(companies), 'targets.csv', workers=8)
+
+    assert [t['company_number'] for t in targets] == [str(COMPANY_BASE + i) for i in range(40)]
+    assert targets[3]['directors'] == 'SMITH, Jane 3; PATEL, Ravi 3'
+    assert targets[3]['sic_codes'] == SIC_CODE
+    with open(in_tmp / 'targets.csv', newline='') as f:
+        assert len(list(csv.DictReader(f))) == 40
+
+    # A second run answers from the cache
+    requests_before = companies_house.stats.totals()['requests']
+    companies_house.build_target_list(iter(companies[:40]), 'targets.csv', workers=8)
+    assert companies_house.stats.totals()['requests'] == requests_before
+
+
+def test_rate_limiter_paces_shared_workers():
+    limiter = companies_house.RateLimiter(requests_per_period=25, period=1, burst=5)  # 20/s after a burst of 5
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: limiter.acquire(), range(15)))
+    # 5 straight away, the other 10 at 20/s
+    assert 0.45 <= time.monotonic() - start < 1.0
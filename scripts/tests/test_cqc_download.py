@@ -0,0 +1,55 @@
+"""cqc_email_builder.download_cqc_data: page checkpoints, resume and capped downloads."""
+
+import csv
+
+import pytest
+
+import cqc_email_builder as cqc
+
+pytestmark = pytest.mark.homes(1200)  # Three pages of 500
+
+
+@pytest.fixture(autouse=True)
+def no_page_pause(monkeypatch):
+    monkeypatch.setattr(cqc.stats, 'sleep', lambda seconds, name='sleep': None)
+
+
+def location_ids(path):
+    with open(path, newline='') as f:
+        return [row['locationId'] for row in csv.DictReader(f)]
+
+
+def test_failed_page_resumes_without_refetching(cqc_services, monkeypatch):
+    original = cqc.fetch_locations_page
+    fetched = []
+    broken = {2}
+
+    def fetch(page, *args):
+        fetched.append(page)
+        if page in broken:
+            raise cqc.requests.HTTPError('503 Service Unavailable')
+        return original(page, *args)
+
+    monkeypatch.setattr(cqc, 'fetch_locations_page', fetch)
+    cqc.download_cqc_data('cqc_care_homes.csv')
+    assert sorted(fetched) == [1, 2, 3]
+    assert cqc.load_sync_state('cqc_care_homes.csv') is None
+
+    broken.clear()
+    fetched.clear()
+    assert cqc.download_cqc_data('cqc_care_homes.csv') == 1200
+    assert fetched == [2]
+    assert location_ids('cqc_care_homes.csv') == [f'1-{i}' for i in range(1200)]
+    assert cqc.load_sync_state('cqc_care_homes.csv')
+
+
+def test_capped_download_is_not_marked_complete(cqc_services):
+    cqc.save_sync_state('cqc_care_homes.csv', '2026-01-05T00:00:00Z')  # From an earlier full download
+
+    assert cqc.download_cqc_data('cqc_care_homes.csv', max_pages=1) == 500
+    assert cqc.load_sync_state('cqc_care_homes.csv') is None
+    assert cqc.sync_cqc_data('cqc_care_homes.csv') is None
+
+    # Lifting the cap carries on from the saved page
+    assert cqc.download_cqc_data('cqc_care_homes.csv') == 1200
+    assert cqc.load_sync_state('cqc_care_homes.csv')
@@ -0,0 +1,66 @@
+"""cqc_email_builder.sync_cqc_data against the CQC fake (homes 1-0 to 1-2; others are 404s)."""
+
+import csv
+
+import pytest
+
+import cqc_email_builder as cqc
+
+SINCE = '2026-01-05T00:00:00Z'
+
+
+@pytest.fixture
+def data_file(in_tmp):
+    path = str(in_tmp / 'cqc_care_homes.csv')
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['locationId', 'locationName'])
+        writer.writeheader()
+        for i in range(4):
+            writer.writerow({'locationId': f'1-{i}', 'locationName': f'Old name {i}'})
+    cqc.save_sync_state(path, SINCE)
+    return path
+
+
+def read_names(path):
+    with open(path, newline='') as f:
+        return {row['locationId']: row['locationName'] for row in csv.DictReader(f)}
+
+
+def test_deleted_location_is_dropped_and_mark_advances(cqc_services, data_file):
+    cqc_services.changes = ['1-1', '1-3']  # 1-3 is a 404: CQC no longer has it
+
+    assert cqc.sync_cqc_data(data_file) == 2
+    assert read_names(data_file) == {'1-0': 'Old name 0', '1-1': 'Bench Care Home 1', '1-2': 'Old name 2'}
+    mark = cqc.load_sync_state(data_file)
+    assert mark > SINCE
+
+    # The next sync starts from the new mark rather than failing on 1-3 again
+    assert cqc.sync_cqc_data(data_file) == 1
+    assert cqc.load_sync_state(data_file) >= mark
+
+
+def test_failed_fetch_keeps_mark_for_retry(cqc_services, data_file):
+    cqc_services.changes = ['1-1', '1-2']
+    cqc_services.failing = {'/cqc/locations/1-2'}
+
+    assert cqc.sync_cqc_data(data_file) is None
+    assert cqc.load_sync_state(data_file) == SINCE
+    names = read_names(data_file)
+    assert names['1-1'] == 'Bench Care Home 1'
+    assert names['1-2'] == 'Old name 2'  # Kept, not dropped
+
+    cqc_services.failing = set()
+    assert cqc.sync_cqc_data(data_file) == 2
+    assert read_names(data_file)['1-2'] == 'Bench Care Home 2'
+    assert cqc.load_sync_state(data_file) > SINCE
+
+
+def test_failed_changes_listing(cqc_services, data_file):
+    cqc_services.failing = {'/cqc/changes/location'}
+
+    assert cqc.sync_cqc_data(data_file) is None
+    assert cqc.load_sync_state(data_file) == SINCE
+
+
+def test_no_sync_state(cqc_services, in_tmp):
+    assert cqc.sync_cqc_data(str(in_tmp / 'missing.csv')) is None
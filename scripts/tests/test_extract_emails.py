@@ -0,0 +1,70 @@
+"""email_scraper.extract_emails and its chunked form, PageScanner."""
+
+import random
+
+import pytest
+
+from bench_extract import synthetic_page
+from email_scraper import PageScanner, analyse_page, extract_emails
+
+
+def cfemail(email, key=0x42):
+    return '%02x' % key + ''.join('%02x' % (ord(c) ^ key) for c in email)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('<a href="mailto:Info@Sunny.co.uk">Email us</a>', 'info@sunny.co.uk'),
+    ('manager [at] sunny [dot] co [dot] uk', 'manager@sunny.co.uk'),
+    ('care(at)home.net', 'care@home.net'),
+    ('care {at} home.net', 'care@home.net'),
+    ('jo&#64;sunny&#46;co&#46;uk', 'jo@sunny.co.uk'),
+    ('jo&commat;sunny.co.uk', 'jo@sunny.co.uk'),
+    ('href="mailto:bob%40home.org"', 'bob@home.org'),
+    ('a.jsmith+care@x.com,', 'a.jsmith+care@x.com'),
+    ('100%care@home.org', '100%care@home.org'),
+    ('.lead@x.org', 'lead@x.org'),
+    ('<span data-cfemail="%s"></span>' % cfemail('cf@prot.co.uk'), 'cf@prot.co.uk'),
+    ('<a href="/cdn-cgi/l/email-protection#%s">' % cfemail('second@prot.co.uk', 7), 'second@prot.co.uk'),
+    ('x' * 64 + '@home.co.uk', 'x' * 64 + '@home.co.uk'),
+])
+def test_finds(text, expected):
+    assert extract_emails(text) == {expected}
+    assert extract_emails(text.encode()) == {expected}
+
+
+@pytest.mark.parametrize('text', [
+    'Follow us @ sunnycare.co.uk',
+    'we are @ home.co.uk',
+    'we are @home.co.uk for tea',
+    'email info @sunny.co.uk',
+    'email info@ sunny.co.uk',
+    '<img src="logo@2x.png">',
+    'bundle@1.2.js',
+    'test@example.com',
+    'x' * 65 + '@home.co.uk',  # Longer than a local part can be - not cut short
+    'we meet at home dot co dot uk',
+])
+def test_ignores(text):
+    assert extract_emails(text) == set()
+    assert extract_emails(text.encode()) == set()
+
+
+def test_start_and_end_offsets():
+    text = 'a@one.com b@two.com c@three.com'
+    assert extract_emails(text, start=10) == {'b@two.com', 'c@three.com'}
+    assert extract_emails(text, end=20) == {'a@one.com', 'b@two.com'}
+
+
+def test_chunked_scan_matches_whole_page():
+    rng = random.Random(1)
+    for _ in range(10):
+        parts = synthetic_page(rng, 40).split(b'</p>')
+        page = b'</p>'.join(part + (b' <a href="/contact-%d">Contact us</a> staff%d@home.co.uk' % (i, i)
+                                    if i % 7 == 0 else b'') for i, part in enumerate(parts))
+        whole = analyse_page(page, 'https://home.co.uk/', 'home.co.uk')
+        assert whole[0]
+        for size in (rng.randint(1, 5000), 100, 65536):
+            scanner = PageScanner('https://home.co.uk/', 'home.co.uk')
+            for i in range(0, len(page), size):
+                scanner.feed(page[i:i + size])
+            assert scanner.close() == whole
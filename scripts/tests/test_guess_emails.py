@@ -0,0 +1,66 @@
+"""Address convention inference and the guesses built from it."""
+
+from email_scraper import (EMAIL_PATTERNS, guess_email_patterns, guess_officer_emails,
+                           guess_people_emails, infer_email_patterns)
+
+
+def test_infer_from_known_names():
+    names = [('jane', 'smith'), ('ravi', 'patel')]
+    known = ['jane.smith@sunny.co.uk', 'ravi.patel@sunny.co.uk', 'info@sunny.co.uk']
+    assert infer_email_patterns(known, names) == ['{first}.{last}@{domain}']
+
+
+def test_infer_from_shape_without_names():
+    assert infer_email_patterns(['j.bloggs@sunny.co.uk']) == ['{f}.{last}@{domain}']
+
+
+def test_infer_ignores_role_addresses():
+    assert infer_email_patterns(['info@sunny.co.uk', 'manager@sunny.co.uk']) == []
+
+
+def test_most_used_convention_wins():
+    known = ['j.bloggs@sunny.co.uk', 'a.jones@sunny.co.uk', 'mary_smith@sunny.co.uk']
+    assert infer_email_patterns(known)[0] == '{f}.{last}@{domain}'
+
+
+def test_guess_uses_inferred_convention():
+    assert guess_email_patterns('Mary Smith', 'www.sunny.co.uk', ['j.bloggs@sunny.co.uk']) == [
+        'm.smith@sunny.co.uk']
+
+
+def test_guess_without_known_emails_uses_every_pattern():
+    assert len(guess_email_patterns('Mary Smith', 'sunny.co.uk')) == len(EMAIL_PATTERNS)
+
+
+def test_known_emails_on_other_domains_are_ignored():
+    assert len(guess_email_patterns('Mary Smith', 'sunny.co.uk', ['j.bloggs@other.co.uk'])) == len(EMAIL_PATTERNS)
+
+
+def test_single_name_falls_back_when_convention_needs_surname():
+    guesses = guess_email_patterns('Mary', 'sunny.co.uk', ['j.bloggs@sunny.co.uk'])
+    assert guesses[0] == 'mary@sunny.co.uk'
+    assert 'info@sunny.co.uk' in guesses
+    assert all('.' not in g.split('@')[0] for g in guesses)
+
+
+def test_single_name_keeps_convention_that_needs_no_surname():
+    known = ['jane@sunny.co.uk', 'ravi@sunny.co.uk']
+    names = ['Mary', 'Jane Smith', 'Ravi Patel']
+    guesses = guess_people_emails(names, 'sunny.co.uk', known)
+    assert guesses['Mary'] == ['mary@sunny.co.uk']
+
+
+def test_batch_mixes_full_and_single_names():
+    guesses = guess_people_emails(['Joe Bloggs', 'Mary'], 'sunny.co.uk', ['a.jones@sunny.co.uk'])
+    assert guesses['Joe Bloggs'] == ['j.bloggs@sunny.co.uk']
+    assert 'mary@sunny.co.uk' in guesses['Mary']
+
+
+def test_officer_guesses_skip_resigned_and_non_directors():
+    officers = {'items': [
+        {'name': 'BLOGGS, Joe', 'officer_role': 'director'},
+        {'name': 'OLD, Former', 'officer_role': 'director', 'resigned_on': '2020-01-01'},
+        {'name': 'JONES, Alan', 'officer_role': 'secretary'},
+    ]}
+    assert guess_officer_emails(officers, 'sunny.co.uk', ['a.jones@sunny.co.uk']) == {
+        'BLOGGS, Joe': ['j.bloggs@sunny.co.uk']}
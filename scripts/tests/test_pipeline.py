@@ -0,0 +1,94 @@
+"""pipeline.run's stage fingerprints, with run_stage replaced by a fake that writes the outputs."""
+
+import itertools
+import json
+import os
+import time
+
+import pytest
+
+import pipeline
+
+
+@pytest.fixture
+def ran(monkeypatch):
+    """Stages run, as (name, refresh); each run writes different outputs."""
+    calls = []
+    runs = itertools.count()
+
+    def run_stage(name, stage, params, tuning, refresh=False):
+        calls.append((name, refresh))
+        inputs = ''.join(open(p).read() for p in pipeline._resolve(stage['inputs'], params))
+        for path in pipeline._resolve(stage['outputs'], params):
+            with open(path, 'w') as f:
+                f.write(f'{name} run {next(runs)}: {json.dumps(params, sort_keys=True)} {len(inputs)}\n')
+        if name == 'download':
+            os.makedirs('cqc_care_homes_pages', exist_ok=True)
+            with open('cqc_care_homes_pages/manifest.json', 'w') as f:
+                json.dump({'complete': not params['--pages']}, f)
+        return 0
+
+    monkeypatch.setattr(pipeline, 'run_stage', run_stage)
+    return calls
+
+
+def names(calls):
+    return [name for name, _ in calls]
+
+
+def test_plan_runs_upstream_first():
+    assert pipeline.plan(['build-list']) == ['download', 'enrich', 'build-list']
+    assert pipeline.plan(['scrape-list', 'build-list']) == ['download', 'enrich', 'websites',
+                                                           'build-list', 'scrape-list']
+
+
+def test_second_run_skips_everything(ran):
+    pipeline.run(['build-list'], {})
+    assert names(ran) == ['download', 'enrich', 'build-list']
+    ran.clear()
+    pipeline.run(['build-list'], {})
+    assert ran == []
+
+
+def test_changed_param_reruns_only_that_stage(ran):
+    pipeline.run(['build-list'], {'--max': '100'})
+    ran.clear()
+    pipeline.run(['build-list'], {'--max': '200'})
+    assert names(ran) == ['build-list']
+
+
+def test_tuning_option_does_not_rerun(ran):
+    pipeline.run(['build-list'], {})
+    ran.clear()
+    pipeline.run(['build-list'], {'--workers': '16'})
+    assert ran == []
+
+
+def test_changed_input_reruns_downstream(ran):
+    pipeline.run(['build-list'], {})
+    ran.clear()
+    with open(pipeline.CQC_DATA, 'a') as f:
+        f.write('edited by hand\n')
+    pipeline.run(['build-list'], {})
+    # download's own output changed, so it reruns too, then everything after it
+    assert names(ran) == ['download', 'enrich', 'build-list']
+
+
+def test_missing_output_reruns(ran):
+    pipeline.run(['build-list'], {})
+    ran.clear()
+    os.remove('careowl_targets.csv')
+    pipeline.run(['build-list'], {})
+    assert names(ran) == ['build-list']
+
+
+def test_old_download_is_synced_but_a_sample_is_downloaded_again(ran):
+    for options in ({}, {'--pages': '2'}):
+        pipeline.run(['download'], options)
+        state = pipeline.load_state()
+        for record in state['stages'].values():
+            record['finished'] = time.time() - 8 * 86400
+        pipeline.save_state(state)
+        ran.clear()
+        pipeline.run(['download'], options)
+        assert ran == [('download', not options)]
@@ -0,0 +1,151 @@
+"""companies_house.sync against a local stand-in for the streaming API."""
+
+import csv
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import companies_house
+
+
+def company_event(timepoint, number, status='active'):
+    return {
+        'resource_kind': 'company-profile',
+        'resource_uri': f'/company/{number}',
+        'data': {'company_number': number, 'company_status': status,
+                 # Padding so the events together fill most of a 512-byte chunk and more
+                 'registered_office_address': {'address_line_1': '1 High Street ' + 'x' * 150,
+                                               'locality': 'Leeds', 'postal_code': 'LS1 1AA'}},
+        'event': {'timepoint': timepoint, 'type': 'changed'},
+    }
+
+
+def officer_event(timepoint, number, name):
+    return {
+        'resource_kind': 'company-officers',
+        'resource_uri': f'/company/{number}/appointments/{timepoint}',
+        'data': {'name': name, 'officer_role': 'director'},
+        'event': {'timepoint': timepoint, 'type': 'changed'},
+    }
+
+
+def stream_handler(streams, after=None, seconds=3.0):
+    """
+    Sends each stream's events straight away, then after() every 0.1s for
+    seconds - None for silence, b'\\n' for heartbeats.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            events = streams.get(self.path.split('?')[0].strip('/'))
+            if events is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            try:
+                self.wfile.write(b''.join(json.dumps(e).encode() + b'\n' for e in events))
+                self.wfile.flush()
+                deadline = time.monotonic() + seconds
+                while time.monotonic() < deadline:
+                    time.sleep(0.1)
+                    if after:
+                        self.wfile.write(after)
+                        self.wfile.flush()
+            except OSError:
+                pass  # Client hung up
+            self.close_connection = True
+
+    return Handler
+
+
+@pytest.fixture
+def targets(in_tmp):
+    path = in_tmp / 'ch_targets.csv'
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['company_name', 'company_number', 'status', 'address',
+                                               'town', 'postcode', 'sic_codes', 'directors'])
+        writer.writeheader()
+        for number in ('00000001', '00000002', '00000003'):
+            writer.writerow({'company_name': f'CARE {number} LTD', 'company_number': number,
+                             'status': 'active', 'directors': ''})
+    return str(path)
+
+
+def read_rows(path):
+    with open(path, newline='') as f:
+        return {row['company_number']: row for row in csv.DictReader(f)}
+
+
+def use_stream(monkeypatch, url):
+    monkeypatch.setattr(companies_house, 'STREAM_URL', url)
+    monkeypatch.setattr(companies_house, 'STREAM_KEY', 'test')
+    monkeypatch.setattr(companies_house, '_cache', None)
+
+
+@pytest.mark.parametrize('after', [None, b'\n'], ids=['silence', 'heartbeats'])
+def test_events_before_going_quiet_are_all_applied(serve, monkeypatch, targets, after):
+    numbers = ['00000001', '00000002', '00000003']
+    use_stream(monkeypatch, serve(stream_handler({
+        'companies': [company_event(10 + i, n, 'liquidation') for i, n in enumerate(numbers)],
+        'officers': [officer_event(20 + i, n, f'SMITH, Jane {i}') for i, n in enumerate(numbers)],
+    }, after=after)))
+
+    start = time.monotonic()
+    checkpoint = companies_house.sync([targets], idle_timeout=0.5)
+
+    # Ended on the idle timeout, not by waiting for the server to give up
+    assert time.monotonic() - start < 2.5
+    assert checkpoint == {'companies': 12, 'officers': 22}
+    rows = read_rows(targets)
+    assert [rows[n]['status'] for n in numbers] == ['liquidation'] * 3
+    assert [rows[n]['directors'] for n in numbers] == [f'SMITH, Jane {i}' for i in range(3)]
+
+
+def test_single_event_then_silence(serve, monkeypatch, targets):
+    use_stream(monkeypatch, serve(stream_handler({
+        'companies': [company_event(5, '00000002', 'dissolved')], 'officers': []})))
+
+    assert companies_house.sync([targets], idle_timeout=0.5) == {'companies': 5}
+    assert read_rows(targets)['00000002']['status'] == 'dissolved'
+
+
+def test_resumes_from_checkpoint(serve, monkeypatch, targets):
+    seen = []
+
+    class Handler(stream_handler({'companies': [], 'officers': []}, seconds=0)):
+        def do_GET(self):
+            seen.append(self.path)
+            super().do_GET()
+
+    use_stream(monkeypatch, serve(Handler))
+    companies_house.save_checkpoint({'companies': 41, 'officers': 7})
+
+    assert companies_house.sync([targets], idle_timeout=0.5) == {'companies': 41, 'officers': 7}
+    assert sorted(seen) == ['/companies?timepoint=41', '/officers?timepoint=7']
+
+
+def test_failed_stream_is_reported_not_caught_up(serve, monkeypatch, targets):
+    # No 'officers' stream: that request gets a 404
+    use_stream(monkeypatch, serve(stream_handler({'companies': [company_event(3, '00000001')]})))
+
+    assert companies_house.sync([targets], idle_timeout=0.5) is None
+    # Events read before the failure are still checkpointed
+    assert companies_house.load_checkpoint() == {'companies': 3}
+
+
+def test_refused_connection_fails(monkeypatch, targets):
+    import socket
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))  # Bound but not listening: connections are refused
+        use_stream(monkeypatch, f'http://127.0.0.1:{unused.getsockname()[1]}')
+        assert companies_house.sync([targets], idle_timeout=0.5) is None